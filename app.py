@@ -6,40 +6,82 @@ Instagram's Terms of Use and applicable laws.
 """
 from __future__ import annotations
 
+import atexit
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
 import os
+import random
 import re
+import secrets
+import sqlite3
+import tempfile
+import threading
 import time
-from collections import deque
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Set, Tuple
 from datetime import datetime, timezone
-from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 from flask import (
     Flask,
     Response,
     abort,
+    make_response,
     redirect,
     render_template,
     request,
+    send_file,
     stream_with_context,
     url_for,
 )
 
 try:
     import instaloader
-    from instaloader.exceptions import ConnectionException, LoginException
+    from instaloader.exceptions import ConnectionException, LoginException, QueryReturnedNotFoundException
 except ModuleNotFoundError as exc:  # pragma: no cover
     raise SystemExit(
         "Missing dependency: instaloader. Install with 'pip install -r requirements.txt'."
     ) from exc
 
+from media_cache import (
+    MEDIA_CACHE,
+    MEDIA_CACHE_DIR,
+    MEDIA_CACHE_SWEEP_SECONDS,
+    MEDIA_CHUNK_MAX,
+    MEDIA_CHUNK_MIN,
+    MEDIA_TIMEOUT_SECONDS,
+    SqliteStore,
+    cdn_url_expiry,
+    is_allowed_media_url,
+    normalize_cdn_url,
+    safe_filename,
+)
+
 try:
     import pymysql
 except ModuleNotFoundError:  # pragma: no cover
     pymysql = None
 
+try:
+    import brotli
+except ModuleNotFoundError:  # pragma: no cover
+    brotli = None
+
+try:
+    # Optional: without Pillow, /media-preview falls back to the full-size proxy.
+    from PIL import Image, ImageOps, features as pil_features
+except ModuleNotFoundError:  # pragma: no cover
+    Image = None
+
 
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 5 * 1024 * 1024
@@ -47,16 +89,72 @@ ADS_TXT = ""  # Paste your AdSense line here later.
 CONTACT_TO = "pv50017@gmail.com"
 DEFAULT_LANG = "en"
 CACHE_TTL_SECONDS = 300
-POST_CACHE: Dict[str, Dict[str, object]] = {}
+# Positive entries live until shortly before their earliest signed CDN link
+# (``oe``) expires, capped by CACHE_MAX_TTL_SECONDS; CACHE_TTL_SECONDS is
+# only the fallback for links without an expiry.
+CACHE_MAX_TTL_SECONDS = int(os.environ.get("CACHE_MAX_TTL_SECONDS", "21600") or 21600)
+CDN_EXPIRY_MARGIN_SECONDS = int(os.environ.get("CDN_EXPIRY_MARGIN_SECONDS", "600") or 600)
+CACHE_REFRESH_WINDOW_SECONDS = int(os.environ.get("CACHE_REFRESH_WINDOW_SECONDS", "300") or 300)
+# Outcome-specific TTLs for negative cache entries: a private account stays
+# private for a while, a metadata block is usually lifted within a minute.
+NEGATIVE_TTLS = {
+    "private": int(os.environ.get("NEGATIVE_TTL_PRIVATE", "1800") or 1800),
+    "blocked": int(os.environ.get("NEGATIVE_TTL_BLOCKED", "30") or 30),
+}
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "5000") or 5000)
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(32 * 1024 * 1024)) or 32 * 1024 * 1024)
+CACHE_SWEEP_SECONDS = int(os.environ.get("CACHE_SWEEP_SECONDS", "60") or 60)
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory").strip().lower()
+CACHE_SQLITE_PATH = os.environ.get(
+    "CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "fastdl-post-cache.sqlite3")
+)
+CACHE_SHARED_MAX_ENTRIES = int(os.environ.get("CACHE_SHARED_MAX_ENTRIES", "200000") or 200000)
+MEDIA_POOL_HOSTS = int(os.environ.get("MEDIA_POOL_HOSTS", "16") or 16)
+MEDIA_POOL_MAXSIZE = int(os.environ.get("MEDIA_POOL_MAXSIZE", "32") or 32)
+PREVIEW_WIDTHS = tuple(
+    sorted({int(w) for w in os.environ.get("PREVIEW_WIDTHS", "320,640,960").split(",") if w.strip().isdigit()})
+)
+PREVIEW_QUALITY = int(os.environ.get("PREVIEW_QUALITY", "78") or 78)
+PREVIEW_DIR = os.environ.get("PREVIEW_DIR", os.path.join(MEDIA_CACHE_DIR, "previews"))
+PREVIEW_MAX_BYTES = int(os.environ.get("PREVIEW_MAX_BYTES", str(256 * 1024 * 1024)) or 0)
+PREVIEW_MAX_SOURCE_BYTES = int(os.environ.get("PREVIEW_MAX_SOURCE_BYTES", str(25 * 1024 * 1024)) or 0)
+PREVIEW_MAX_AGE = int(os.environ.get("PREVIEW_MAX_AGE", "86400") or 86400)
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", "512") or 512)
+PAGE_CACHE_MAX_AGE = int(os.environ.get("PAGE_CACHE_MAX_AGE", "300") or 300)
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024") or 1024)
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6") or 6)
+COMPRESS_BR_QUALITY = int(os.environ.get("COMPRESS_BR_QUALITY", "5") or 5)
+SITEMAP_MAX_URLS = int(os.environ.get("SITEMAP_MAX_URLS", "50000") or 50000)
+DEPLOY_TIME = os.environ.get("DEPLOY_TIME", "").strip()
 RATE_LIMIT_WINDOW_SECONDS = 10
 RATE_LIMIT_MAX_REQUESTS = 6
-RATE_LIMITS: Dict[str, deque] = {}
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000") or 100000)
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory").strip().lower()
+RATE_LIMIT_SQLITE_PATH = os.environ.get(
+    "RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "fastdl-rate-limits.sqlite3")
+)
 STATS_KEY = os.environ.get("STATS_KEY", "5988")
 DB_HOST = os.environ.get("DB_HOST", "")
 DB_PORT = int(os.environ.get("DB_PORT", "3306") or 3306)
 DB_NAME = os.environ.get("DB_NAME", "")
 DB_USER = os.environ.get("DB_USER", "")
 DB_PASS = os.environ.get("DB_PASS", "")
+DB_TIMEOUT = int(os.environ.get("DB_TIMEOUT", "2") or 2)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "2") or 2)
+STATS_FLUSH_SECONDS = float(os.environ.get("STATS_FLUSH_SECONDS", "2") or 2)
+STATS_FLUSH_EVENTS = int(os.environ.get("STATS_FLUSH_EVENTS", "500") or 500)
+LOADER_POOL_SIZE = int(os.environ.get("LOADER_POOL_SIZE", "4") or 4)
+LOADER_MAX_AGE_SECONDS = int(os.environ.get("LOADER_MAX_AGE_SECONDS", "900") or 900)
+LOADER_MAX_USES = int(os.environ.get("LOADER_MAX_USES", "200") or 200)
+RESOLVE_WAIT_SECONDS = float(os.environ.get("RESOLVE_WAIT_SECONDS", "20") or 20)
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5") or 5)
+BREAKER_BASE_SECONDS = float(os.environ.get("BREAKER_BASE_SECONDS", "30") or 30)
+BREAKER_MAX_SECONDS = float(os.environ.get("BREAKER_MAX_SECONDS", "600") or 600)
+BREAKER_PROBE_SECONDS = float(os.environ.get("BREAKER_PROBE_SECONDS", "30") or 30)
+BREAKER_BACKEND = os.environ.get("BREAKER_BACKEND", "memory").strip().lower()
+BREAKER_SQLITE_PATH = os.environ.get(
+    "BREAKER_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "fastdl-breaker.sqlite3")
+)
 STATS: Dict[str, int] = {
     "total_requests": 0,
     "cache_hits": 0,
@@ -64,6 +162,8 @@ STATS: Dict[str, int] = {
     "metadata_blocked": 0,
     "invalid_links": 0,
     "success": 0,
+    "negative_cache_hits": 0,
+    "breaker_rejected": 0,
 }
 
 LANG_ORDER = [
@@ -555,7 +655,6 @@ MEDIA_URL_RE = re.compile(
     re.IGNORECASE,
 )
 
-ALLOWED_HOST_SUFFIXES = ("cdninstagram.com", "fbcdn.net", "instagram.com")
 MEDIA_SLUGS = {
     "video": "video-download",
     "reels": "reels-download",
@@ -568,10 +667,25 @@ MEDIA_ENDPOINTS = {
 }
 
 
-def build_strings(lang: str) -> Dict[str, str]:
+def merge_strings(lang: str) -> Mapping[str, str]:
     base = STRINGS[DEFAULT_LANG].copy()
     base.update(STRINGS.get(lang, {}))
-    return base
+    return MappingProxyType(base)
+
+
+# Merged once at import and shared read-only by every request.
+LANG_STRINGS: Dict[str, Mapping[str, str]] = {lang: merge_strings(lang) for lang in LANGS}
+
+
+def build_strings(lang: str) -> Mapping[str, str]:
+    return LANG_STRINGS.get(lang) or LANG_STRINGS[DEFAULT_LANG]
+
+
+@lru_cache(maxsize=256)
+def page_body(lang: str, page: str, base: str) -> str:
+    t = build_strings(lang)
+    template = t.get(f"page_{page}_html", t[f"page_{page}_body"])
+    return template.format(brand=t["brand"], contact_url=f"{base}/{lang}/contact")
 
 
 def get_lang(lang: str) -> str:
@@ -586,24 +700,122 @@ def base_url() -> str:
     return request.url_root.rstrip("/")
 
 
-CONTENT_DIR = Path(__file__).resolve().parent / "static" / "content"
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+CONTENT_DIR = STATIC_DIR / "content"
+ASSET_SUFFIXES = {".css", ".js", ".svg", ".png", ".jpg", ".webp", ".ico", ".woff2"}
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg"}
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ASSET_REF_RE = re.compile(r"/static/([A-Za-z0-9_./-]+)")
+
+
+class Asset:
+    __slots__ = ("path", "url_name", "digest", "mimetype", "variants")
+
+    def __init__(self, path: Path, url_name: str, digest: str, mimetype: str) -> None:
+        self.path = path
+        self.url_name = url_name
+        self.digest = digest
+        self.mimetype = mimetype
+        # encoding -> body, only for compressible assets kept in memory.
+        self.variants: Dict[str, bytes] = {}
+
+
+def build_assets() -> Tuple[Dict[str, Asset], Dict[str, Asset]]:
+    """Fingerprint static assets and precompress the text ones.
+
+    Returns ``(by_source_name, by_url_name)``, where the URL name embeds a
+    content hash (``style.3f2a9c1b7d4e.css``) so it can be cached forever.
+    """
+    by_source: Dict[str, Asset] = {}
+    by_url: Dict[str, Asset] = {}
+    for path in sorted(STATIC_DIR.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in ASSET_SUFFIXES:
+            continue
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        source = path.relative_to(STATIC_DIR).as_posix()
+        url_name = f"{source[: -len(path.suffix)]}.{digest}{path.suffix}"
+        mimetype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        asset = Asset(path, url_name, digest, mimetype)
+        if path.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            asset.variants["identity"] = data
+            asset.variants["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                asset.variants["br"] = brotli.compress(data, quality=11)
+        by_source[source] = asset
+        by_url[url_name] = asset
+    return by_source, by_url
+
+
+ASSETS, ASSETS_BY_URL = build_assets()
+
+
+def asset_url(name: str) -> str:
+    asset = ASSETS.get(name)
+    return f"/assets/{asset.url_name}" if asset else f"/static/{name}"
+
+
+def fingerprint_static_refs(html: str) -> str:
+    return ASSET_REF_RE.sub(lambda match: asset_url(match.group(1)), html)
+
+
+app.jinja_env.globals["asset_url"] = asset_url
+
+
+def preferred_encoding(available) -> str:
+    accepted = request.accept_encodings
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted[encoding] > 0:
+            return encoding
+    return "identity"
+
+
+CONTENT_RELOAD = os.environ.get("CONTENT_RELOAD", "").strip().lower() in {"1", "true", "yes"}
+# (lang, media_type) -> fragment, with the English fallback already applied.
+LONG_HTML: Dict[Tuple[str, str], str] = {}
+LONG_HTML_MTIMES: Tuple[float, ...] = ()
+
+
+def content_paths() -> List[Path]:
+    return [CONTENT_DIR / lang / f"{media_type}.html" for lang in LANGS for media_type in MEDIA_SLUGS]
+
+
+def content_mtimes() -> Tuple[float, ...]:
+    mtimes = []
+    for path in content_paths():
+        try:
+            mtimes.append(path.stat().st_mtime)
+        except OSError:
+            mtimes.append(0.0)
+    return tuple(mtimes)
+
+
+def load_content() -> None:
+    global LONG_HTML, LONG_HTML_MTIMES
+    mtimes = content_mtimes() if CONTENT_RELOAD else ()
+    fragments: Dict[Tuple[str, str], str] = {}
+    for media_type in MEDIA_SLUGS:
+        default_path = CONTENT_DIR / DEFAULT_LANG / f"{media_type}.html"
+        default_html = default_path.read_text(encoding="utf-8") if default_path.is_file() else ""
+        for lang in LANGS:
+            path = CONTENT_DIR / lang / f"{media_type}.html"
+            html = path.read_text(encoding="utf-8") if path.is_file() else default_html
+            fragments[(lang, media_type)] = fingerprint_static_refs(html)
+    LONG_HTML = fragments
+    LONG_HTML_MTIMES = mtimes
 
 
 def load_long_html(lang: str, media_type: str) -> str:
     media_type = normalize_media_type(media_type)
-    candidates = [
-        CONTENT_DIR / lang / f"{media_type}.html",
-        CONTENT_DIR / DEFAULT_LANG / f"{media_type}.html",
-    ]
-    for path in candidates:
-        if path.is_file():
-            return path.read_text(encoding="utf-8")
-    return ""
+    if CONTENT_RELOAD and content_mtimes() != LONG_HTML_MTIMES:
+        load_content()
+    html = LONG_HTML.get((lang, media_type))
+    if html is None:
+        html = LONG_HTML.get((DEFAULT_LANG, media_type), "")
+    return html
 
 
-def safe_filename(name: str) -> str:
-    cleaned = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_")
-    return cleaned or "instagram_media"
+load_content()
 
 
 def make_loader() -> "instaloader.Instaloader":
@@ -619,18 +831,199 @@ def make_loader() -> "instaloader.Instaloader":
     return loader
 
 
+class PooledLoader:
+    __slots__ = ("loader", "created", "uses")
+
+    def __init__(self, loader: "instaloader.Instaloader") -> None:
+        self.loader = loader
+        self.created = time.time()
+        self.uses = 0
+
+
+class LoaderPool:
+    """Per-worker pool of warm Instaloader contexts.
+
+    Each loader keeps its own requests session, so reusing one keeps the
+    TLS connection to Instagram alive between resolves. Loaders are recycled
+    once they get too old, have served too many requests or have recorded
+    errors in their context.
+    """
+
+    def __init__(self, size: int, max_age: float, max_uses: int) -> None:
+        self.size = max(1, size)
+        self.max_age = max_age
+        self.max_uses = max(1, max_uses)
+        self._idle: deque = deque()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.stats: Dict[str, int] = {"created": 0, "reused": 0, "recycled": 0}
+
+    def _healthy(self, slot: PooledLoader) -> bool:
+        if time.time() - slot.created > self.max_age:
+            return False
+        if slot.uses >= self.max_uses:
+            return False
+        return not slot.loader.context.error_log
+
+    def _discard(self, slot: PooledLoader) -> None:
+        self.stats["recycled"] += 1
+        try:
+            slot.loader.close()
+        except Exception:
+            pass
+
+    def acquire(self) -> PooledLoader:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked after warm-up: never share sockets with the parent.
+                self._idle.clear()
+                self._pid = os.getpid()
+            while self._idle:
+                slot = self._idle.pop()
+                if self._healthy(slot):
+                    self.stats["reused"] += 1
+                    slot.uses += 1
+                    return slot
+                self._discard(slot)
+            self.stats["created"] += 1
+        slot = PooledLoader(make_loader())
+        slot.uses = 1
+        return slot
+
+    def release(self, slot: PooledLoader, *, healthy: bool = True) -> None:
+        with self._lock:
+            if healthy and self._healthy(slot) and len(self._idle) < self.size:
+                self._idle.append(slot)
+                return
+            self._discard(slot)
+
+    @contextmanager
+    def checkout(self):
+        slot = self.acquire()
+        healthy = False
+        try:
+            yield slot.loader
+            healthy = True
+        except (LoginException, UpstreamUnavailable):
+            healthy = True
+            raise
+        finally:
+            self.release(slot, healthy=healthy)
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+
+LOADER_POOL = LoaderPool(LOADER_POOL_SIZE, LOADER_MAX_AGE_SECONDS, LOADER_MAX_USES)
+
+
+class ResolveTimeout(Exception):
+    pass
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling Instagram while the circuit breaker is open."""
+
+
+class InFlightCall:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: object = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait up to ``timeout`` seconds and receive the same result or
+    exception.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[str, InFlightCall] = {}
+        self.stats: Dict[str, int] = {"leaders": 0, "coalesced": 0, "timeouts": 0}
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = InFlightCall()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                self.stats["timeouts"] += 1
+                raise ResolveTimeout(key)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+RESOLVES = SingleFlight(RESOLVE_WAIT_SECONDS)
+
+
+def is_metadata_block(exc: BaseException) -> bool:
+    # Instaloader raises BadResponseException("Fetching Post metadata
+    # failed.") when Instagram withholds post data from anonymous clients;
+    # it is treated as a temporary block everywhere.
+    return "Fetching Post metadata failed" in str(exc)
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    if is_metadata_block(exc):
+        return True
+    return isinstance(exc, ConnectionException) and not isinstance(exc, QueryReturnedNotFoundException)
+
+
 def fetch_post_with_retry(
     loader: "instaloader.Instaloader", shortcode: str, *, retries: int = 2, delay: float = 1.5
 ) -> "instaloader.Post":
+    # The breaker hears once per resolve, after the retries are spent, and
+    # counts each shortcode once, so one bad link cannot trip it. A
+    # LoginException is reported as neither: a login wall is not an outage,
+    # nor proof that one is over.
     for attempt in range(retries + 1):
+        if not UPSTREAM_BREAKER.allow():
+            raise UpstreamUnavailable(shortcode)
         try:
-            return instaloader.Post.from_shortcode(loader.context, shortcode)
+            post = instaloader.Post.from_shortcode(loader.context, shortcode)
         except Exception as exc:
-            if "Fetching Post metadata failed" in str(exc):
-                if attempt < retries:
-                    time.sleep(delay)
-                    continue
+            if (
+                is_metadata_block(exc)
+                and attempt < retries
+                and UPSTREAM_BREAKER.is_closed()
+            ):
+                time.sleep(random.uniform(delay / 2, delay))
+                continue
+            if is_upstream_failure(exc):
+                UPSTREAM_BREAKER.record_failure(shortcode)
             raise
+        UPSTREAM_BREAKER.record_success()
+        return post
 
 
 def get_client_ip() -> str:
@@ -640,30 +1033,645 @@ def get_client_ip() -> str:
     return request.remote_addr or "unknown"
 
 
+class TokenBucketLimiter:
+    """Per-key token buckets in constant space per key.
+
+    Each key holds ``(tokens, last_refill)``. Buckets are kept in access
+    order, so keys idle long enough to have refilled completely sit at the
+    front and are dropped on the next check; a full bucket and a missing
+    key behave the same. ``max_keys`` is a hard cap enforced by evicting
+    the least recently seen key.
+    """
+
+    def __init__(self, capacity: int, per_seconds: float, max_keys: int) -> None:
+        self.capacity = float(max(1, capacity))
+        self.rate = self.capacity / per_seconds
+        self.idle_after = per_seconds
+        self.max_keys = max(1, max_keys)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"limited": 0, "swept": 0, "evicted": 0}
+
+    def hit(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens = self.capacity
+            else:
+                tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            limited = tokens < 1.0
+            if limited:
+                self.stats["limited"] += 1
+            else:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            self._sweep(now)
+            return limited
+
+    def _sweep(self, now: float) -> None:
+        buckets = self._buckets
+        cutoff = now - self.idle_after
+        while buckets:
+            oldest = next(iter(buckets))
+            if buckets[oldest][1] > cutoff:
+                break
+            del buckets[oldest]
+            self.stats["swept"] += 1
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            data = dict(self.stats)
+            data["keys"] = len(self._buckets)
+            return data
+
+
+class SqliteTokenBucketLimiter(SqliteStore):
+    """Token buckets shared by every worker on the host.
+
+    Fails open: if SQLite is unavailable the request is not limited.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS rate_limits ("
+        "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+    )
+
+    def __init__(self, path: str, capacity: int, per_seconds: float, max_keys: int) -> None:
+        super().__init__(path)
+        self.capacity = float(max(1, capacity))
+        self.rate = self.capacity / per_seconds
+        self.idle_after = per_seconds
+        self.max_keys = max(1, max_keys)
+        self._next_sweep = 0.0
+        self.stats: Dict[str, int] = {"limited": 0, "errors": 0}
+
+    def hit(self, key: str) -> bool:
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    tokens = self.capacity
+                else:
+                    tokens = min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+                limited = tokens < 1.0
+                if not limited:
+                    tokens -= 1.0
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                if now >= self._next_sweep:
+                    self._next_sweep = now + self.idle_after
+                    conn.execute(
+                        "DELETE FROM rate_limits WHERE updated < ?", (now - self.idle_after,)
+                    )
+                    conn.execute(
+                        "DELETE FROM rate_limits WHERE key IN ("
+                        "SELECT key FROM rate_limits ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                        (self.max_keys,),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+            return False
+        if limited:
+            self.stats["limited"] += 1
+        return limited
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+
+def make_rate_limiter():
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SqliteTokenBucketLimiter(
+            RATE_LIMIT_SQLITE_PATH,
+            RATE_LIMIT_MAX_REQUESTS,
+            RATE_LIMIT_WINDOW_SECONDS,
+            RATE_LIMIT_MAX_KEYS,
+        )
+    return TokenBucketLimiter(RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW_SECONDS, RATE_LIMIT_MAX_KEYS)
+
+
+RATE_LIMITER = make_rate_limiter()
+
+
 def is_rate_limited(ip: str) -> bool:
-    now = time.time()
-    bucket = RATE_LIMITS.setdefault(ip, deque())
-    while bucket and now - bucket[0] > RATE_LIMIT_WINDOW_SECONDS:
-        bucket.popleft()
-    if len(bucket) >= RATE_LIMIT_MAX_REQUESTS:
-        return True
-    bucket.append(now)
-    return False
+    return RATE_LIMITER.hit(ip)
+
+
+def breaker_delay(opens: int) -> float:
+    """Open period for the n-th consecutive trip: exponential, with jitter."""
+    ceiling = min(BREAKER_MAX_SECONDS, BREAKER_BASE_SECONDS * (2 ** max(0, opens - 1)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class CircuitBreaker:
+    """Process-wide breaker for Instagram metadata requests.
+
+    Closed until resolves of ``threshold`` distinct shortcodes have failed
+    upstream with no success in between, then open for
+    ``breaker_delay()`` seconds, failing every resolve fast. After that one
+    caller is let through as a half-open probe: success closes the breaker,
+    failure re-opens it with a longer delay. A probe that never reports
+    back is replaced after ``probe_timeout`` seconds.
+    """
+
+    def __init__(self, threshold: int, probe_timeout: float) -> None:
+        self.threshold = max(1, threshold)
+        self.probe_timeout = probe_timeout
+        self.state = "closed"
+        self.failing: Set[str] = set()
+        self.opens = 0
+        self.open_until = 0.0
+        self.probe_until = 0.0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"opened": 0, "half_opened": 0, "closed": 0, "rejected": 0}
+
+    def is_closed(self) -> bool:
+        return self.state == "closed"
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        now = time.time()
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and now >= self.open_until:
+                self.state = "half_open"
+                self.stats["half_opened"] += 1
+                self.probe_until = now + self.probe_timeout
+                return True
+            if self.state == "half_open" and now >= self.probe_until:
+                self.probe_until = now + self.probe_timeout
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        if self.state == "closed" and not self.failing:
+            return
+        with self._lock:
+            self.failing.clear()
+            self.opens = 0
+            if self.state != "closed":
+                self.state = "closed"
+                self.stats["closed"] += 1
+
+    def record_failure(self, key: str) -> None:
+        with self._lock:
+            if len(self.failing) < self.threshold:
+                self.failing.add(key)
+            if self.state == "half_open" or (self.state == "closed" and len(self.failing) >= self.threshold):
+                self.failing.clear()
+                self.opens += 1
+                self.open_until = time.time() + breaker_delay(self.opens)
+                self.state = "open"
+                self.stats["opened"] += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        data: Dict[str, object] = dict(self.stats)
+        data["state"] = self.state
+        return data
+
+
+class SqliteCircuitBreaker(SqliteStore):
+    """The same breaker with its state shared by every worker on the host.
+
+    The half-open probe is claimed with a conditional UPDATE so only one
+    worker probes at a time. Fails open if SQLite errors.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS upstream_breaker ("
+        "name TEXT PRIMARY KEY, state TEXT NOT NULL, failing TEXT NOT NULL, "
+        "opens INTEGER NOT NULL, open_until REAL NOT NULL, probe_until REAL NOT NULL)"
+    )
+    name = "instagram"
+
+    def __init__(self, path: str, threshold: int, probe_timeout: float) -> None:
+        super().__init__(path)
+        self.threshold = max(1, threshold)
+        self.probe_timeout = probe_timeout
+        self.stats: Dict[str, int] = {"opened": 0, "half_opened": 0, "closed": 0, "rejected": 0, "errors": 0}
+
+    def _row(self, conn: sqlite3.Connection) -> Tuple[str, List[str], int, float, float]:
+        row = conn.execute(
+            "SELECT state, failing, opens, open_until, probe_until FROM upstream_breaker WHERE name = ?",
+            (self.name,),
+        ).fetchone()
+        if row is None:
+            return ("closed", [], 0, 0.0, 0.0)
+        return (row[0], json.loads(row[1]), row[2], row[3], row[4])
+
+    def state(self) -> str:
+        try:
+            return self._row(self._conn())[0]
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+            return "closed"
+
+    def is_closed(self) -> bool:
+        return self.state() == "closed"
+
+    def allow(self) -> bool:
+        now = time.time()
+        try:
+            conn = self._conn()
+            state, _failing, _opens, open_until, probe_until = self._row(conn)
+            if state == "closed":
+                return True
+            if (state == "open" and now >= open_until) or (state == "half_open" and now >= probe_until):
+                claimed = conn.execute(
+                    "UPDATE upstream_breaker SET state = 'half_open', probe_until = ? "
+                    "WHERE name = ? AND state = ? AND probe_until = ?",
+                    (now + self.probe_timeout, self.name, state, probe_until),
+                ).rowcount
+                if claimed:
+                    if state == "open":
+                        self.stats["half_opened"] += 1
+                    return True
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def record_success(self) -> None:
+        try:
+            conn = self._conn()
+            state, failing = self._row(conn)[:2]
+            if state == "closed" and not failing:
+                return
+            conn.execute(
+                "UPDATE upstream_breaker SET state = 'closed', failing = '[]', opens = 0 WHERE name = ?",
+                (self.name,),
+            )
+            if state != "closed":
+                self.stats["closed"] += 1
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+
+    def record_failure(self, key: str) -> None:
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                state, failing, opens, open_until, probe_until = self._row(conn)
+                if key not in failing and len(failing) < self.threshold:
+                    failing.append(key)
+                if state == "half_open" or (state == "closed" and len(failing) >= self.threshold):
+                    failing = []
+                    opens += 1
+                    open_until = time.time() + breaker_delay(opens)
+                    state = "open"
+                    self.stats["opened"] += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO upstream_breaker "
+                    "(name, state, failing, opens, open_until, probe_until) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.name, state, json.dumps(failing), opens, open_until, probe_until),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        data: Dict[str, object] = dict(self.stats)
+        data["state"] = self.state()
+        return data
+
+
+def make_breaker():
+    if BREAKER_BACKEND == "sqlite":
+        return SqliteCircuitBreaker(BREAKER_SQLITE_PATH, BREAKER_FAILURES, BREAKER_PROBE_SECONDS)
+    return CircuitBreaker(BREAKER_FAILURES, BREAKER_PROBE_SECONDS)
+
+
+UPSTREAM_BREAKER = make_breaker()
+
+
+def approx_size(value: object) -> int:
+    if isinstance(value, str):
+        return 49 + len(value)
+    if isinstance(value, dict):
+        return 64 + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 56 + sum(approx_size(v) for v in value)
+    return 28
+
+
+class PostCache:
+    """LRU of resolved posts bounded by entry count and approximate bytes.
+
+    Expired entries are dropped on access and by a sweep that runs at most
+    every ``sweep_interval`` seconds from the write path.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, sweep_interval: float) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.sweep_interval = sweep_interval
+        self._data: "OrderedDict[str, Tuple[float, int, Dict[str, object]]]" = OrderedDict()
+        self._bytes = 0
+        self._next_sweep = time.time() + sweep_interval
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def _remove(self, key: str) -> None:
+        _expires, size, _entry = self._data.pop(key)
+        self._bytes -= size
+
+    def lookup(self, key: str) -> Optional[Tuple[float, Dict[str, object]]]:
+        with self._lock:
+            record = self._data.get(key)
+            if record is None:
+                self.stats["misses"] += 1
+                return None
+            if record[0] < time.time():
+                self._remove(key)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return record[0], record[2]
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        found = self.lookup(key)
+        return found[1] if found else None
+
+    def set(self, key: str, entry: Dict[str, object], ttl: float) -> None:
+        size = approx_size(key) + approx_size(entry)
+        now = time.time()
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = (now + ttl, size, entry)
+            self._bytes += size
+            if now >= self._next_sweep:
+                self._sweep(now)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.stats["evictions"] += 1
+
+    def _sweep(self, now: float) -> None:
+        expired = [key for key, record in self._data.items() if record[0] < now]
+        for key in expired:
+            self._remove(key)
+        self.stats["expired"] += len(expired)
+        self._next_sweep = now + self.sweep_interval
+
+    def sweep(self) -> None:
+        with self._lock:
+            self._sweep(time.time())
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            data = dict(self.stats)
+            data["entries"] = len(self._data)
+            data["bytes"] = self._bytes
+            return data
+
+
+class SqlitePostCache(SqliteStore):
+    """Post cache shared by every worker on the host through a SQLite WAL file.
+
+    Any SQLite error is treated as a miss so the cache can never fail a
+    request.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS post_cache ("
+        "key TEXT PRIMARY KEY, expires REAL NOT NULL, value TEXT NOT NULL)"
+    )
+
+    def __init__(self, path: str, max_entries: int, sweep_interval: float) -> None:
+        super().__init__(path)
+        self.max_entries = max(1, max_entries)
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "errors": 0}
+
+    def lookup(self, key: str) -> Optional[Tuple[float, Dict[str, object]]]:
+        try:
+            row = self._conn().execute(
+                "SELECT expires, value FROM post_cache WHERE key = ? AND expires >= ?",
+                (key, time.time()),
+            ).fetchone()
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+            return None
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return row[0], load_items(json.loads(row[1]))
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        found = self.lookup(key)
+        return found[1] if found else None
+
+    def set(self, key: str, entry: Dict[str, object], ttl: float) -> None:
+        now = time.time()
+        value = json.dumps(entry, separators=(",", ":"))
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO post_cache (key, expires, value) VALUES (?, ?, ?)",
+                (key, now + ttl, value),
+            )
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_interval
+                self._sweep(conn, now)
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM post_cache WHERE expires < ?", (now,))
+        conn.execute(
+            "DELETE FROM post_cache WHERE key IN ("
+            "SELECT key FROM post_cache ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def sweep(self) -> None:
+        try:
+            self._sweep(self._conn(), time.time())
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        data = dict(self.stats)
+        try:
+            data["entries"] = self._conn().execute("SELECT COUNT(*) FROM post_cache").fetchone()[0]
+        except sqlite3.Error:
+            pass
+        return data
+
+
+class TieredPostCache:
+    """Per-worker LRU in front of a host-wide shared cache."""
+
+    def __init__(self, local: PostCache, shared: SqlitePostCache) -> None:
+        self.local = local
+        self.shared = shared
+
+    def lookup(self, key: str) -> Optional[Tuple[float, Dict[str, object]]]:
+        """Local copy first; the shared one if the local copy is missing, or
+        is due for refresh and another worker may already have refreshed it."""
+        local = self.local.lookup(key)
+        if local is not None and not refresh_due(*local):
+            return local
+        shared = self.shared.lookup(key)
+        if shared is None or (local is not None and shared[0] <= local[0]):
+            return local
+        self.local.set(key, shared[1], shared[0] - time.time())
+        return shared
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        found = self.lookup(key)
+        return found[1] if found else None
+
+    def set(self, key: str, entry: Dict[str, object], ttl: float) -> None:
+        self.local.set(key, entry, ttl)
+        self.shared.set(key, entry, ttl)
+
+    def sweep(self) -> None:
+        self.local.sweep()
+        self.shared.sweep()
+
+    def snapshot(self) -> Dict[str, int]:
+        data = self.local.snapshot()
+        data.update({f"shared_{name}": value for name, value in self.shared.snapshot().items()})
+        return data
+
+
+def make_post_cache():
+    local = PostCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_SWEEP_SECONDS)
+    if CACHE_BACKEND == "sqlite":
+        shared = SqlitePostCache(CACHE_SQLITE_PATH, CACHE_SHARED_MAX_ENTRIES, CACHE_SWEEP_SECONDS)
+        return TieredPostCache(local, shared)
+    return local
+
+
+POST_CACHE = make_post_cache()
+
+
+def entry_ttl(entry: Dict[str, object]) -> float:
+    """Seconds ``entry`` may be served: until CDN_EXPIRY_MARGIN_SECONDS
+    before its earliest signed link expires, at most CACHE_MAX_TTL_SECONDS."""
+    expiries = [cdn_url_expiry(item.url) for item in entry.get("items", ())]
+    expiries = [expiry for expiry in expiries if expiry is not None]
+    if not expiries:
+        return CACHE_TTL_SECONDS
+    return min(CACHE_MAX_TTL_SECONDS, min(expiries) - CDN_EXPIRY_MARGIN_SECONDS - time.time())
+
+
+def refresh_due(expires: float, entry: Dict[str, object]) -> bool:
+    """Whether a hit on ``entry`` should refresh it ahead of ``expires``.
+
+    Only entries whose TTL came from signed CDN links qualify; the flat
+    CACHE_TTL_SECONDS fallback is no longer than the window and would be
+    re-resolved on every first hit.
+    """
+    if entry.get("negative") or expires - time.time() >= CACHE_REFRESH_WINDOW_SECONDS:
+        return False
+    return any(cdn_url_expiry(item.url) is not None for item in entry.get("items", ()))
+
+
+class PostRefresher:
+    """Refresh-ahead for cached posts.
+
+    A hit on an entry within CACHE_REFRESH_WINDOW_SECONDS of its expiry is
+    still served, and the post is re-resolved once in the background
+    through the same single-flight as foreground misses. Its links stay
+    valid for at least CDN_EXPIRY_MARGIN_SECONDS beyond that expiry, so a
+    stale entry never hands out a dead URL. A failed refresh leaves the
+    entry to expire normally. Each post is refreshed at most once per
+    window, so links that come back already short-lived are not re-fetched
+    on every hit.
+    """
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self._pending: set = set()
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"scheduled": 0, "refreshed": 0, "failed": 0}
+
+    def schedule(self, shortcode: str) -> None:
+        now = time.time()
+        with self._lock:
+            while self._recent and next(iter(self._recent.values())) < now - self.window:
+                self._recent.popitem(last=False)
+            if shortcode in self._pending or shortcode in self._recent:
+                return
+            self._pending.add(shortcode)
+            self._recent[shortcode] = now
+            self.stats["scheduled"] += 1
+        try:
+            resolver_pool().submit(self._refresh, shortcode)
+        except RuntimeError:  # pragma: no cover - interpreter shutting down
+            with self._lock:
+                self._pending.discard(shortcode)
+
+    def _refresh(self, shortcode: str) -> None:
+        try:
+            RESOLVES.do(shortcode, lambda: resolve_post(shortcode, cache_blocked=False))
+            self.stats["refreshed"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(shortcode)
+
+    def snapshot(self) -> Dict[str, int]:
+        data = dict(self.stats)
+        with self._lock:
+            data["pending"] = len(self._pending)
+        return data
+
+
+POST_REFRESHER = PostRefresher(CACHE_REFRESH_WINDOW_SECONDS)
 
 
 def get_cached_post(shortcode: str) -> Optional[Dict[str, object]]:
-    entry = POST_CACHE.get(shortcode)
-    if not entry:
-        return None
-    if entry.get("expires", 0) < time.time():
-        POST_CACHE.pop(shortcode, None)
+    found = POST_CACHE.lookup(shortcode)
+    if found is None:
         return None
-    return entry
+    if refresh_due(*found):
+        POST_REFRESHER.schedule(shortcode)
+    return found[1]
+
 
+def set_cached_post(shortcode: str, entry: Dict[str, object], ttl: Optional[float] = None) -> None:
+    ttl = entry_ttl(entry) if ttl is None else ttl
+    if ttl > 0:
+        POST_CACHE.set(shortcode, entry, ttl)
 
-def set_cached_post(shortcode: str, entry: Dict[str, object]) -> None:
-    entry["expires"] = time.time() + CACHE_TTL_SECONDS
-    POST_CACHE[shortcode] = entry
+
+def set_negative_post(shortcode: str, outcome: str) -> Dict[str, object]:
+    entry: Dict[str, object] = {"negative": outcome}
+    set_cached_post(shortcode, entry, NEGATIVE_TTLS[outcome])
+    return entry
 
 
 def inc_stat(key: str) -> None:
@@ -671,6 +1679,24 @@ def inc_stat(key: str) -> None:
     inc_stat_db(key)
 
 
+def runtime_stats() -> Dict[str, object]:
+    """Per-worker counters that are not persisted to the stats table."""
+    data: Dict[str, object] = {f"loader_pool_{name}": value for name, value in LOADER_POOL.stats.items()}
+    data["loader_pool_idle"] = LOADER_POOL.idle_count()
+    data.update({f"resolve_{name}": value for name, value in RESOLVES.stats.items()})
+    data["resolve_in_flight"] = RESOLVES.in_flight()
+    data.update({f"post_cache_{name}": value for name, value in POST_CACHE.snapshot().items()})
+    data.update({f"post_refresh_{name}": value for name, value in POST_REFRESHER.snapshot().items()})
+    data.update({f"rate_limit_{name}": value for name, value in RATE_LIMITER.snapshot().items()})
+    data.update({f"media_http_{name}": value for name, value in MEDIA_HTTP.snapshot().items()})
+    data.update({f"media_cache_{name}": value for name, value in MEDIA_CACHE.snapshot().items()})
+    data.update({f"page_cache_{name}": value for name, value in PAGE_CACHE.snapshot().items()})
+    data.update({f"breaker_{name}": value for name, value in UPSTREAM_BREAKER.snapshot().items()})
+    data.update({f"resolve_jobs_{name}": value for name, value in RESOLVE_JOBS.snapshot().items()})
+    data.update({f"preview_{name}": value for name, value in PREVIEWS.snapshot().items()})
+    return data
+
+
 def db_enabled() -> bool:
     return bool(DB_HOST and DB_NAME and DB_USER and DB_PASS and pymysql)
 
@@ -684,7 +1710,9 @@ def get_db_connection():
         password=DB_PASS,
         database=DB_NAME,
         port=DB_PORT,
-        connect_timeout=5,
+        connect_timeout=DB_TIMEOUT,
+        read_timeout=DB_TIMEOUT,
+        write_timeout=DB_TIMEOUT,
         charset="utf8mb4",
         autocommit=True,
     )
@@ -702,40 +1730,166 @@ def ensure_stats_table(conn) -> None:
         )
 
 
+class DBPool:
+    """Small per-worker pool of persistent MySQL connections.
+
+    A connection that raises while checked out is closed instead of being
+    returned, so the next checkout reconnects. The stats table is created
+    once when the pool is built; if the database is unreachable then, the
+    first checkout tries again.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, size)
+        self._idle: deque = deque()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._schema_ready = False
+        if db_enabled():
+            try:
+                conn = get_db_connection()
+                try:
+                    ensure_stats_table(conn)
+                    self._schema_ready = True
+                finally:
+                    conn.close()
+            except Exception:
+                pass
+
+    def _take(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle.clear()
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        conn = get_db_connection()
+        if conn is not None and not self._schema_ready:
+            try:
+                ensure_stats_table(conn)
+            except Exception:
+                conn.close()
+                raise
+            self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._take()
+        if conn is None:
+            raise RuntimeError("stats database is not configured")
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            raise
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+DB_POOL = DBPool(DB_POOL_SIZE)
+
+
+class StatsWriter:
+    """Batch stat increments and write them from a background thread.
+
+    Requests only bump an in-memory counter; a daemon thread flushes the
+    accumulated deltas every ``interval`` seconds, or sooner once
+    ``max_events`` increments are pending, as one multi-row upsert.
+    Deltas from a failed flush are merged back and retried on the next one.
+    """
+
+    def __init__(self, pool: DBPool, interval: float, max_events: int) -> None:
+        self.pool = pool
+        self.interval = interval
+        self.max_events = max(1, max_events)
+        self._pending: Dict[str, int] = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+
+    def add(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+            self._events += 1
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="stats-writer", daemon=True)
+                self._thread.start()
+            if self._events >= self.max_events:
+                self._wake.set()
+
+    def _run(self) -> None:
+        try:
+            with self.pool.connection():
+                pass
+        except Exception:
+            pass
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._events = 0
+            if not pending:
+                return
+            rows = list(pending.items())
+            placeholders = ", ".join(["(%s, %s)"] * len(rows))
+            params = [value for row in rows for value in row]
+            try:
+                with self.pool.connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            f"""
+                            INSERT INTO stats (name, value)
+                            VALUES {placeholders}
+                            ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+                            """,
+                            params,
+                        )
+            except Exception:
+                with self._lock:
+                    for key, amount in rows:
+                        self._pending[key] = self._pending.get(key, 0) + amount
+
+
+STATS_WRITER = StatsWriter(DB_POOL, STATS_FLUSH_SECONDS, STATS_FLUSH_EVENTS)
+
+
+@atexit.register
+def flush_stats_db() -> None:
+    if db_enabled():
+        STATS_WRITER.flush()
+
+
 def inc_stat_db(key: str) -> None:
     if not db_enabled():
         return
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return
-        ensure_stats_table(conn)
-        with conn.cursor() as cursor:
-            cursor.execute(
-                """
-                INSERT INTO stats (name, value)
-                VALUES (%s, 1)
-                ON DUPLICATE KEY UPDATE value = value + 1
-                """,
-                (key,),
-            )
-        conn.close()
-    except Exception:
-        pass
+    STATS_WRITER.add(key)
 
 
 def load_stats_db() -> Optional[Dict[str, int]]:
     if not db_enabled():
         return None
+    STATS_WRITER.flush()
     try:
-        conn = get_db_connection()
-        if not conn:
-            return None
-        ensure_stats_table(conn)
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT name, value FROM stats")
-            rows = cursor.fetchall()
-        conn.close()
+        with DB_POOL.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT name, value FROM stats")
+                rows = cursor.fetchall()
         return {row[0]: int(row[1]) for row in rows}
     except Exception:
         return None
@@ -762,45 +1916,340 @@ def is_reel(post: "instaloader.Post") -> bool:
     return False
 
 
-def extract_items(post: "instaloader.Post", media_type: str) -> List[Dict[str, str]]:
-    items: List[Dict[str, str]] = []
+class MediaItem(NamedTuple):
+    """One downloadable file of a post. Tuple-backed, so cached entries stay
+    small and serialize to JSON as plain arrays."""
+
+    type: str
+    url: str
+    name: str
+
 
+def extract_media(post: "instaloader.Post") -> Tuple[MediaItem, ...]:
+    """Classify every node of ``post`` in a single pass."""
     if post.typename == "GraphSidecar":
-        nodes = list(post.get_sidecar_nodes())
-        for idx, node in enumerate(nodes, start=1):
+        items = []
+        for idx, node in enumerate(post.get_sidecar_nodes(), start=1):
             is_video = node.is_video
-            if media_type == "photo" and is_video:
-                continue
-            if media_type in {"video", "reels"} and not is_video:
-                continue
             url = node.video_url if is_video else node.display_url
             if not url:
                 continue
-            ext = ".mp4" if is_video else ".jpg"
-            filename = safe_filename(f"{post.shortcode}_{idx}{ext}")
-            items.append({"type": "video" if is_video else "photo", "url": url, "name": filename})
-    else:
-        is_video = getattr(post, "is_video", False)
-        url = post.video_url if is_video else post.url
-        if not url:
-            return []
-        if media_type == "photo" and is_video:
-            return []
-        if media_type in {"video", "reels"} and not is_video:
-            return []
-        ext = ".mp4" if is_video else ".jpg"
-        filename = safe_filename(f"{post.shortcode}{ext}")
-        items.append({"type": "video" if is_video else "photo", "url": url, "name": filename})
-
-    return items
-
-
-def is_allowed_media_url(url: str) -> bool:
-    parsed = urlparse(url)
-    if parsed.scheme not in {"http", "https"}:
-        return False
-    host = parsed.hostname or ""
-    return any(host == suffix or host.endswith(f".{suffix}") for suffix in ALLOWED_HOST_SUFFIXES)
+            kind, ext = ("video", ".mp4") if is_video else ("photo", ".jpg")
+            items.append(MediaItem(kind, url, safe_filename(f"{post.shortcode}_{idx}{ext}")))
+        return tuple(items)
+    is_video = getattr(post, "is_video", False)
+    url = post.video_url if is_video else post.url
+    if not url:
+        return ()
+    kind, ext = ("video", ".mp4") if is_video else ("photo", ".jpg")
+    return (MediaItem(kind, url, safe_filename(f"{post.shortcode}{ext}")),)
+
+
+def media_view(items: Tuple[MediaItem, ...], media_type: str) -> List[MediaItem]:
+    """The items shown for ``media_type``: photos for photo, videos otherwise."""
+    kind = "photo" if media_type == "photo" else "video"
+    return [item for item in items if item.type == kind]
+
+
+def load_items(entry: Dict[str, object]) -> Dict[str, object]:
+    """Turn the arrays of a JSON-decoded entry back into MediaItem records."""
+    if entry.get("items"):
+        entry["items"] = tuple(MediaItem(*item) for item in entry["items"])
+    elif "video_items" in entry or "photo_items" in entry:
+        # Written before items were stored once; expires with the cache TTL.
+        legacy = entry.pop("video_items", []) + entry.pop("photo_items", [])
+        entry["items"] = tuple(MediaItem(item["type"], item["url"], item["name"]) for item in legacy)
+    return entry
+
+
+def resolve_post(shortcode: str, *, cache_blocked: bool = True) -> Dict[str, object]:
+    # Post properties load lazily through the loader's context, so keep
+    # the loader checked out until extraction is done.
+    # Private and blocked outcomes are cached as negative entries so that
+    # retries of the same link do not go back to Instagram right away.
+    try:
+        with LOADER_POOL.checkout() as loader:
+            post = fetch_post_with_retry(loader, shortcode)
+            owner_profile = getattr(post, "owner_profile", None)
+            if owner_profile and getattr(owner_profile, "is_private", False):
+                return set_negative_post(shortcode, "private")
+            entry: Dict[str, object] = {"items": extract_media(post), "is_reel": is_reel(post)}
+    except LoginException:
+        return set_negative_post(shortcode, "private")
+    except Exception as exc:
+        if cache_blocked and is_metadata_block(exc):
+            set_negative_post(shortcode, "blocked")
+        raise
+    set_cached_post(shortcode, entry)
+    return entry
+
+
+def resolve_post_shared(shortcode: str) -> Dict[str, object]:
+    return RESOLVES.do(shortcode, lambda: resolve_post(shortcode))
+
+
+class MediaHTTP:
+    """Shared keep-alive session for fetching media from the Instagram CDN.
+
+    urllib3 keeps one connection pool per CDN host (up to ``pool_hosts``
+    hosts, ``pool_maxsize`` connections each), so proxy and download
+    requests reuse warm TLS connections. The session is rebuilt after a
+    fork.
+    """
+
+    def __init__(self, pool_hosts: int, pool_maxsize: int) -> None:
+        self.pool_hosts = max(1, pool_hosts)
+        self.pool_maxsize = max(1, pool_maxsize)
+        self._session: Optional[requests.Session] = None
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    def session(self) -> requests.Session:
+        session = self._session
+        if session is not None and self._pid == os.getpid():
+            return session
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_hosts,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=0,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+                self._pid = os.getpid()
+            return self._session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", MEDIA_TIMEOUT_SECONDS)
+        return self.session().get(url, **kwargs)
+
+    def snapshot(self) -> Dict[str, int]:
+        data = {"hosts": 0, "requests": 0, "connections": 0, "reused": 0}
+        session = self._session
+        if session is None or self._pid != os.getpid():
+            return data
+        pools = session.get_adapter("https://").poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            data["hosts"] += 1
+            data["requests"] += pool.num_requests
+            data["connections"] += pool.num_connections
+        data["reused"] = max(0, data["requests"] - data["connections"])
+        return data
+
+
+MEDIA_HTTP = MediaHTTP(MEDIA_POOL_HOSTS, MEDIA_POOL_MAXSIZE)
+
+
+def is_identity_encoded(resp: requests.Response) -> bool:
+    return resp.headers.get("Content-Encoding", "identity").strip().lower() in {"", "identity"}
+
+
+def iter_media(resp: requests.Response):
+    """Stream an upstream media response with growing chunk sizes.
+
+    Unencoded bodies are read straight from the urllib3 stream, starting at
+    MEDIA_CHUNK_MIN for a quick first byte and doubling up to
+    MEDIA_CHUNK_MAX. Closing in ``finally`` releases the upstream
+    connection even when the client disconnects mid-stream.
+    """
+    try:
+        if not is_identity_encoded(resp):
+            yield from resp.iter_content(chunk_size=MEDIA_CHUNK_MIN)
+            return
+        raw = resp.raw
+        chunk_size = MEDIA_CHUNK_MIN
+        while True:
+            chunk = raw.read(chunk_size, decode_content=False)
+            if not chunk:
+                break
+            yield chunk
+            chunk_size = min(chunk_size * 2, MEDIA_CHUNK_MAX)
+    finally:
+        resp.close()
+
+
+def media_headers(resp: requests.Response, keys: Tuple[str, ...]) -> Dict[str, str]:
+    headers = {key: resp.headers[key] for key in keys if key in resp.headers}
+    if not is_identity_encoded(resp):
+        # iter_media decodes these, so the upstream length no longer applies.
+        headers.pop("Content-Length", None)
+    return headers
+
+
+class PreviewUnavailable(Exception):
+    pass
+
+
+class PreviewCache(SqliteStore):
+    """Downscaled photo previews, rendered once per (photo, width, format).
+
+    Previews are stored as files named after the normalized CDN URL. A
+    SQLite index next to them records each file's size and last access,
+    so a periodic sweep can delete the least recently used files once the
+    total passes ``max_bytes`` without walking the directory. Concurrent
+    misses for the same preview render it once.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS previews ("
+        "name TEXT PRIMARY KEY, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+    )
+
+    def __init__(self, root: str, widths: Tuple[int, ...], max_bytes: int, sweep_interval: float) -> None:
+        super().__init__(os.path.join(root, "index.sqlite3"))
+        self.root = root
+        self.widths = widths
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._ready = False
+        self._renders = SingleFlight(MEDIA_TIMEOUT_SECONDS * 2)
+        self.stats: Dict[str, int] = {
+            "hits": 0, "rendered": 0, "failed": 0, "evicted": 0, "source_bytes": 0, "errors": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None and self.max_bytes > 0 and bool(self.widths)
+
+    def _conn(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(self.root, exist_ok=True)
+            self._ready = True
+        return super()._conn()
+
+    def formats(self) -> Tuple[str, ...]:
+        if Image is not None and pil_features.check("webp"):
+            return ("webp", "jpeg")
+        return ("jpeg",)
+
+    def width_for(self, requested: int) -> int:
+        for width in self.widths:
+            if width >= requested:
+                return width
+        return self.widths[-1]
+
+    def path_for(self, url: str, width: int, fmt: str) -> str:
+        digest = hashlib.sha1(normalize_cdn_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}-{width}.{fmt}")
+
+    def get(self, url: str, width: int, fmt: str) -> str:
+        """Return the path of the preview, rendering it on a miss."""
+        path = self.path_for(url, width, fmt)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return self._renders.do(path, lambda: self._render(url, width, fmt, path))
+        if time.time() - mtime > 60:
+            try:
+                os.utime(path)
+                self._touch(path)
+            except (OSError, sqlite3.Error):
+                self.stats["errors"] += 1
+        self.stats["hits"] += 1
+        return path
+
+    def _touch(self, path: str) -> None:
+        """Record ``path`` in the index with its current size and access time."""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO previews (name, size, accessed) VALUES (?, ?, ?)",
+            (os.path.basename(path), os.path.getsize(path), time.time()),
+        )
+
+    def _fetch(self, url: str) -> bytes:
+        resp = MEDIA_HTTP.get(url, stream=True, headers={"Accept-Encoding": "identity"})
+        try:
+            length = resp.headers.get("Content-Length", "")
+            if resp.status_code != 200 or (length.isdigit() and int(length) > PREVIEW_MAX_SOURCE_BYTES):
+                raise PreviewUnavailable(url)
+            data = resp.raw.read(PREVIEW_MAX_SOURCE_BYTES + 1, decode_content=True)
+        finally:
+            resp.close()
+        if len(data) > PREVIEW_MAX_SOURCE_BYTES:
+            raise PreviewUnavailable(url)
+        self.stats["source_bytes"] += len(data)
+        return data
+
+    def _render(self, url: str, width: int, fmt: str, path: str) -> str:
+        if os.path.exists(path):
+            return path
+        try:
+            data = self._fetch(url)
+            image = Image.open(io.BytesIO(data))
+            image.draft("RGB", (width, width * 4))
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            if image.width > width:
+                image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                image.save(fh, format=fmt.upper(), quality=PREVIEW_QUALITY, optimize=fmt == "jpeg")
+            os.replace(tmp, path)
+        except (OSError, ValueError, Image.DecompressionBombError, requests.RequestException) as exc:
+            self.stats["failed"] += 1
+            raise PreviewUnavailable(url) from exc
+        self.stats["rendered"] += 1
+        try:
+            self._touch(path)
+            now = time.time()
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_interval
+                self.evict()
+        except (OSError, sqlite3.Error):
+            self.stats["errors"] += 1
+        return path
+
+    def evict(self) -> None:
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM previews").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims: List[str] = []
+        target = total - int(self.max_bytes * 0.9)
+        for name, size in conn.execute("SELECT name, size FROM previews ORDER BY accessed"):
+            if target <= 0:
+                break
+            victims.append(name)
+            target -= size
+        for name in victims:
+            conn.execute("DELETE FROM previews WHERE name = ?", (name,))
+            try:
+                os.unlink(os.path.join(self.root, name[:2], name))
+            except OSError:
+                pass
+        self.stats["evicted"] += len(victims)
+
+    def snapshot(self) -> Dict[str, int]:
+        data = dict(self.stats)
+        data["rendering"] = self._renders.in_flight()
+        return data
+
+
+PREVIEWS = PreviewCache(PREVIEW_DIR, PREVIEW_WIDTHS, PREVIEW_MAX_BYTES, MEDIA_CACHE_SWEEP_SECONDS)
+
+
+def preview_url(url: str, width: Optional[int] = None) -> str:
+    if not PREVIEWS.enabled:
+        return url_for("media_proxy", url=url)
+    return url_for("media_preview", url=url, w=width or PREVIEWS.widths[0])
+
+
+def preview_srcset(url: str) -> str:
+    if not PREVIEWS.enabled:
+        return ""
+    return ", ".join(f"{preview_url(url, width)} {width}w" for width in PREVIEWS.widths)
+
+
+app.jinja_env.globals["preview_url"] = preview_url
+app.jinja_env.globals["preview_srcset"] = preview_srcset
 
 
 def normalize_media_type(value: str) -> str:
@@ -840,18 +2289,139 @@ def page_meta(
     return page_title, page_description, seo_title, seo_paragraphs
 
 
+COMPRESS_ENCODINGS = {"gzip", "br"} if brotli is not None else {"gzip"}
+COMPRESS_MIMETYPES = {"text/html", "text/plain", "text/css", "application/xml", "application/json"}
+# Media bodies are already compressed and are streamed; never buffer them.
+UNCOMPRESSED_ENDPOINTS = {"media_proxy", "media_preview", "download_file", "asset", "static"}
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BR_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code != 200
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESS_MIMETYPES
+        or request.endpoint in UNCOMPRESSED_ENDPOINTS
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = preferred_encoding(COMPRESS_ENCODINGS)
+    if encoding == "identity":
+        return response
+    response.set_data(compress_body(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+class PageCache:
+    """LRU of rendered GET pages keyed by page, language and base URL."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[Tuple[str, ...], Tuple[str, Dict[str, bytes]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def get(self, key: Tuple[str, ...]) -> Optional[Tuple[str, Dict[str, bytes]]]:
+        with self._lock:
+            found = self._data.get(key)
+            if found is None:
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return found
+
+    def set(self, key: Tuple[str, ...], value: Tuple[str, Dict[str, bytes]]) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            data = dict(self.stats)
+            data["entries"] = len(self._data)
+            return data
+
+
+PAGE_CACHE = PageCache(PAGE_CACHE_MAX_ENTRIES)
+
+
+def cached_page(
+    key: Tuple[str, ...],
+    render,
+    *,
+    mimetype: str = "text/html",
+    last_modified: Optional[datetime] = None,
+) -> Response:
+    """Serve a GET page from PAGE_CACHE with a strong ETag.
+
+    ``render`` is only called on a miss. Compressed variants are produced
+    on first request for each encoding and kept next to the plain body.
+    With CONTENT_RELOAD the page is rendered every time so content edits
+    show up immediately.
+    """
+    key = key + (base_url(),)
+    found = None if CONTENT_RELOAD else PAGE_CACHE.get(key)
+    if found is None:
+        body = render().encode("utf-8")
+        found = (hashlib.sha1(body).hexdigest(), {"identity": body})
+        if not CONTENT_RELOAD:
+            PAGE_CACHE.set(key, found)
+    etag, variants = found
+    encoding = "identity"
+    if len(variants["identity"]) >= COMPRESS_MIN_BYTES:
+        encoding = preferred_encoding(COMPRESS_ENCODINGS)
+    if encoding not in variants:
+        variants[encoding] = compress_body(variants["identity"], encoding)
+    response = Response(variants[encoding], mimetype=mimetype)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+        etag = f"{etag}-{encoding}"
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = f"public, max-age={PAGE_CACHE_MAX_AGE}"
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        PAGE_CACHE.stats["not_modified"] += 1
+    return response
+
+
 def render_index(
     lang: str,
     *,
     selected_type: str = "video",
     page_slug: str = "",
-    items: Optional[List[Dict[str, str]]] = None,
+    items: Optional[List[MediaItem]] = None,
     media_url: str = "",
     error: Optional[str] = None,
     modal_show: bool = False,
     modal_title: Optional[str] = None,
     modal_message: Optional[str] = None,
     modal_retry: bool = False,
+    job_id: Optional[str] = None,
 ):
     t = build_strings(lang)
     selected_type = normalize_media_type(selected_type)
@@ -886,6 +2456,10 @@ def render_index(
         modal_title=modal_title,
         modal_message=modal_message,
         modal_retry=modal_retry,
+        job_id=job_id,
+        job_url=url_for("api_job", job_id=job_id) if job_id else None,
+        job_page_url=url_for(MEDIA_ENDPOINTS[selected_type], lang=lang, job=job_id) if job_id else None,
+        job_poll_ms=JOB_POLL_MS,
     )
 
 
@@ -900,195 +2474,200 @@ def root():
 @app.route("/<lang>/")
 def index(lang: str):
     lang = get_lang(lang)
-    return render_index(lang, selected_type="video", page_slug="")
+    return cached_page(
+        ("index", lang, ""),
+        lambda: render_index(lang, selected_type="video", page_slug=""),
+    )
 
 
-def process_download(lang: str, media_type: str):
-    lang = get_lang(lang)
-    t = build_strings(lang)
+def resolve_media(
+    media_url: str,
+    media_type: str,
+    *,
+    client_ip: Optional[str] = None,
+    entry: Optional[Dict[str, object]] = None,
+) -> Dict[str, object]:
+    """Resolve a pasted link into the items for ``media_type``.
+
+    Returns ``{"status": "ok", "items": [...], "is_reel": bool}`` or a dict
+    whose ``status`` is one of ``invalid_link``, ``private``, ``mismatch``
+    (with ``mismatch`` set to ``reel``, ``photo`` or ``video``),
+    ``rate_limited``, ``blocked``, ``timeout``, ``connection_error`` or
+    ``error`` (with ``detail``). Shared by the HTML form flow and the API.
+
+    ``client_ip`` defaults to the current request's client; pass it when
+    resolving outside a request. ``entry`` skips the cache lookup when the
+    caller already holds the cached post.
+    """
     media_type = normalize_media_type(media_type)
-    page_slug = MEDIA_SLUGS[media_type]
-
     inc_stat("total_requests")
-    media_url = (request.form.get("media_url") or "").strip()
     parsed = parse_media_url(media_url)
     if not parsed:
         inc_stat("invalid_links")
-        return render_index(
-            lang,
-            selected_type=media_type,
-            page_slug=page_slug,
-            media_url=media_url,
-            error=t["error_invalid_link"],
-        )
+        return {"status": "invalid_link"}
 
     url_kind, shortcode = parsed
 
-    cached = get_cached_post(shortcode)
-    if cached:
+    if entry is None:
+        entry = get_cached_post(shortcode)
+    if entry:
+        negative = entry.get("negative")
+        if negative:
+            inc_stat("negative_cache_hits")
+            inc_stat(f"negative_{negative}_hits")
+            return {"status": negative}
         inc_stat("cache_hits")
-        if media_type == "reels" and not (url_kind == "reel" or cached.get("is_reel")):
-            return render_index(
-                lang,
-                selected_type=media_type,
-                page_slug=page_slug,
-                media_url=media_url,
-                modal_show=True,
-                modal_title=t["modal_mismatch_title"],
-                modal_message=t["modal_mismatch_reel"],
-            )
-
-        cached_items = (
-            cached.get("photo_items", [])
-            if media_type == "photo"
-            else cached.get("video_items", [])
-        )
-        if not cached_items:
-            mismatch = t["modal_mismatch_photo"] if media_type == "photo" else t["modal_mismatch_video"]
-            return render_index(
-                lang,
-                selected_type=media_type,
-                page_slug=page_slug,
-                media_url=media_url,
-                modal_show=True,
-                modal_title=t["modal_mismatch_title"],
-                modal_message=mismatch,
-            )
-
-        inc_stat("success")
-        return render_index(
-            lang,
-            selected_type=media_type,
-            page_slug=page_slug,
-            media_url=media_url,
-            items=cached_items,
+    else:
+        if is_rate_limited(client_ip or get_client_ip()):
+            inc_stat("rate_limited")
+            return {"status": "rate_limited"}
+        try:
+            entry = resolve_post_shared(shortcode)
+        except ResolveTimeout:
+            return {"status": "timeout"}
+        except UpstreamUnavailable:
+            inc_stat("breaker_rejected")
+            return {"status": "blocked"}
+        except ConnectionException as exc:
+            return {"status": "connection_error", "detail": str(exc)}
+        except Exception as exc:  # pragma: no cover
+            if is_metadata_block(exc):
+                inc_stat("metadata_blocked")
+                return {"status": "blocked"}
+            return {"status": "error", "detail": str(exc)}
+        if entry.get("negative"):
+            return {"status": entry["negative"]}
+
+    is_reel_flag = bool(entry.get("is_reel"))
+    if media_type == "reels" and not (url_kind == "reel" or is_reel_flag):
+        return {"status": "mismatch", "mismatch": "reel", "is_reel": is_reel_flag}
+
+    items = media_view(entry.get("items", ()), media_type)
+    if not items:
+        return {
+            "status": "mismatch",
+            "mismatch": "photo" if media_type == "photo" else "video",
+            "is_reel": is_reel_flag,
+        }
+
+    inc_stat("success")
+    return {"status": "ok", "items": items, "is_reel": is_reel_flag}
+
+
+def result_view(t: Mapping[str, str], result: Dict[str, object]) -> Dict[str, object]:
+    """Map a resolve_media() result onto render_index() keyword arguments."""
+    status = result["status"]
+    if status == "ok":
+        return {"items": result["items"]}
+    if status == "invalid_link":
+        return {"error": t["error_invalid_link"]}
+    if status == "connection_error":
+        return {"error": f"Connection error: {result['detail']}"}
+    if status == "error":
+        return {"error": f"Unexpected error: {result['detail']}"}
+    if status == "private":
+        title, message = t["modal_private_title"], t["modal_private_body"]
+    elif status == "mismatch":
+        title, message = t["modal_mismatch_title"], t[f"modal_mismatch_{result['mismatch']}"]
+    elif status == "rate_limited":
+        title = t.get("modal_rate_title", "Please wait")
+        message = t.get(
+            "modal_rate_body",
+            "Too many requests. Please wait a few seconds and try again.",
         )
-
-    if is_rate_limited(get_client_ip()):
-        inc_stat("rate_limited")
-        return render_index(
-            lang,
-            selected_type=media_type,
-            page_slug=page_slug,
-            media_url=media_url,
-            modal_show=True,
-            modal_title=t.get("modal_rate_title", "Please wait"),
-            modal_message=t.get(
-                "modal_rate_body",
-                "Too many requests. Please wait a few seconds and try again.",
+    else:
+        return {
+            "modal_show": True,
+            "modal_title": t.get("modal_temp_title", "Please try again"),
+            "modal_message": t.get(
+                "modal_temp_body",
+                "Instagram temporarily blocked this request. Please wait a minute and try again.",
             ),
-        )
+            "modal_retry": True,
+        }
+    return {"modal_show": True, "modal_title": title, "modal_message": message}
 
-    try:
-        loader = make_loader()
-        post = fetch_post_with_retry(loader, shortcode)
 
-        owner_profile = getattr(post, "owner_profile", None)
-        if owner_profile and getattr(owner_profile, "is_private", False):
-            return render_index(
+def process_download(lang: str, media_type: str):
+    lang = get_lang(lang)
+    t = build_strings(lang)
+    media_type = normalize_media_type(media_type)
+    media_url = (request.form.get("media_url") or "").strip()
+    parsed = parse_media_url(media_url)
+    entry = get_cached_post(parsed[1]) if parsed else None
+    if RESOLVE_ASYNC and parsed and entry is None and not request.form.get("sync"):
+        job_id = submit_resolve_job(media_url, media_type, get_client_ip())
+        response = make_response(
+            render_index(
                 lang,
                 selected_type=media_type,
-                page_slug=page_slug,
+                page_slug=MEDIA_SLUGS[media_type],
                 media_url=media_url,
-                modal_show=True,
-                modal_title=t["modal_private_title"],
-                modal_message=t["modal_private_body"],
+                job_id=job_id,
             )
-
-        is_reel_flag = is_reel(post)
-        video_items = extract_items(post, "video")
-        photo_items = extract_items(post, "photo")
-        set_cached_post(
-            shortcode,
-            {
-                "video_items": video_items,
-                "photo_items": photo_items,
-                "is_reel": is_reel_flag,
-            },
         )
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    result = resolve_media(media_url, media_type, entry=entry)
+    return render_index(
+        lang,
+        selected_type=media_type,
+        page_slug=MEDIA_SLUGS[media_type],
+        media_url=media_url,
+        **result_view(t, result),
+    )
 
-        if media_type == "reels" and not (url_kind == "reel" or is_reel_flag):
-            return render_index(
-                lang,
-                selected_type=media_type,
-                page_slug=page_slug,
-                media_url=media_url,
-                modal_show=True,
-                modal_title=t["modal_mismatch_title"],
-                modal_message=t["modal_mismatch_reel"],
-            )
-
-        items = photo_items if media_type == "photo" else video_items
-        if not items:
-            mismatch = t["modal_mismatch_photo"] if media_type == "photo" else t["modal_mismatch_video"]
-            return render_index(
-                lang,
-                selected_type=media_type,
-                page_slug=page_slug,
-                media_url=media_url,
-                modal_show=True,
-                modal_title=t["modal_mismatch_title"],
-                modal_message=mismatch,
-            )
-
-        inc_stat("success")
-        return render_index(
-            lang,
-            selected_type=media_type,
-            page_slug=page_slug,
-            media_url=media_url,
-            items=items,
-        )
 
-    except LoginException:
-        return render_index(
-            lang,
-            selected_type=media_type,
-            page_slug=page_slug,
-            media_url=media_url,
-            modal_show=True,
-            modal_title=t["modal_private_title"],
-            modal_message=t["modal_private_body"],
-        )
-    except ConnectionException as exc:
-        return render_index(
-            lang,
-            selected_type=media_type,
-            page_slug=page_slug,
-            media_url=media_url,
-            error=f"Connection error: {exc}",
-        )
-    except Exception as exc:  # pragma: no cover
-        if "Fetching Post metadata failed" in str(exc):
-            inc_stat("metadata_blocked")
-            return render_index(
+def job_page(lang: str, media_type: str, job_id: str):
+    """Render a resolve job: its results once finished, the waiting page
+    while it runs, or an "expired" notice if the job is unknown."""
+    job = RESOLVE_JOBS.get(job_id)
+    if job is None:
+        t = build_strings(lang)
+        response = make_response(
+            render_index(
                 lang,
                 selected_type=media_type,
-                page_slug=page_slug,
-                media_url=media_url,
+                page_slug=MEDIA_SLUGS[media_type],
                 modal_show=True,
-                modal_title=t.get("modal_temp_title", "Please try again"),
+                modal_title=t.get("modal_expired_title", "Link expired"),
                 modal_message=t.get(
-                    "modal_temp_body",
-                    "Instagram temporarily blocked this request. Please wait a minute and try again.",
+                    "modal_expired_body",
+                    "This download link has expired. Please paste the Instagram link again.",
                 ),
-                modal_retry=True,
             )
-        return render_index(
+        )
+        response.status_code = 404
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    media_type = normalize_media_type(str(job["media_type"]))
+    kwargs: Dict[str, object] = {"job_id": job_id}
+    if job["result"] is not None:
+        kwargs = result_view(build_strings(lang), job["result"])
+    response = make_response(
+        render_index(
             lang,
             selected_type=media_type,
-            page_slug=page_slug,
-            media_url=media_url,
-            error=f"Unexpected error: {exc}",
+            page_slug=MEDIA_SLUGS[media_type],
+            media_url=str(job["media_url"]),
+            **kwargs,
         )
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
 
 def media_page(lang: str, media_type: str):
     lang = get_lang(lang)
     media_type = normalize_media_type(media_type)
     page_slug = MEDIA_SLUGS[media_type]
+    if request.method == "GET" and request.args.get("job"):
+        return job_page(lang, media_type, request.args["job"])
     if request.method == "GET":
-        return render_index(lang, selected_type=media_type, page_slug=page_slug)
+        return cached_page(
+            ("index", lang, page_slug),
+            lambda: render_index(lang, selected_type=media_type, page_slug=page_slug),
+        )
     form_type = normalize_media_type(request.form.get("media_type") or media_type)
     return process_download(lang, form_type)
 
@@ -1114,58 +2693,453 @@ def download(lang: str):
     return process_download(lang, media_type)
 
 
+API_ERROR_STATUS = {
+    "invalid_link": 400,
+    "private": 403,
+    "mismatch": 422,
+    "rate_limited": 429,
+    "blocked": 503,
+    "timeout": 503,
+    "connection_error": 502,
+    "error": 500,
+}
+API_CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", "60") or 60)
+
+
+BATCH_MAX_URLS = int(os.environ.get("BATCH_MAX_URLS", "20") or 20)
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "4") or 4)
+BATCH_TIMEOUT_SECONDS = float(os.environ.get("BATCH_TIMEOUT_SECONDS", "60") or 60)
+BATCH_POOL: Optional[ThreadPoolExecutor] = None
+BATCH_POOL_PID = 0
+BATCH_POOL_LOCK = threading.Lock()
+
+
+RESOLVE_ASYNC = os.environ.get("RESOLVE_ASYNC", "1").strip().lower() not in {"0", "false", "no", "off"}
+RESOLVER_WORKERS = int(os.environ.get("RESOLVER_WORKERS", "4") or 4)
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", "300") or 300)
+JOB_MAX_ENTRIES = int(os.environ.get("JOB_MAX_ENTRIES", "10000") or 10000)
+JOB_POLL_MS = int(os.environ.get("JOB_POLL_MS", "700") or 700)
+# Jobs are shared through SQLite by default so a poll can land on any
+# worker; "memory" is only safe with a single worker process.
+JOB_BACKEND = os.environ.get("JOB_BACKEND", "sqlite").strip().lower()
+JOB_SQLITE_PATH = os.environ.get(
+    "JOB_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "fastdl-jobs.sqlite3")
+)
+RESOLVER_POOL: Optional[ThreadPoolExecutor] = None
+RESOLVER_POOL_PID = 0
+RESOLVER_POOL_LOCK = threading.Lock()
+
+
+class ResolveJobs:
+    """Resolve jobs keyed by an opaque id, kept for ``ttl`` seconds.
+
+    A job is ``{"media_url", "media_type", "result"}`` where ``result`` stays
+    None until a resolver thread stores the resolve_media() output. Jobs
+    live in this worker only; use :class:`SqliteResolveJobs` when polls can
+    land on a different worker than the submit.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._jobs: "OrderedDict[str, Tuple[float, Dict[str, object]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"created": 0, "finished": 0, "missing": 0}
+
+    def create(self, media_url: str, media_type: str) -> str:
+        job_id = secrets.token_urlsafe(12)
+        now = time.time()
+        with self._lock:
+            while self._jobs:
+                created, _job = next(iter(self._jobs.values()))
+                if created >= now - self.ttl and len(self._jobs) < self.max_entries:
+                    break
+                self._jobs.popitem(last=False)
+            self._jobs[job_id] = (now, {"media_url": media_url, "media_type": media_type, "result": None})
+            self.stats["created"] += 1
+        return job_id
+
+    def finish(self, job_id: str, result: Dict[str, object]) -> None:
+        with self._lock:
+            found = self._jobs.get(job_id)
+            if found is not None:
+                found[1]["result"] = result
+                self.stats["finished"] += 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            found = self._jobs.get(job_id)
+            if found is None or found[0] < time.time() - self.ttl:
+                self.stats["missing"] += 1
+                return None
+            return dict(found[1])
+
+    def snapshot(self) -> Dict[str, int]:
+        data = dict(self.stats)
+        with self._lock:
+            data["entries"] = len(self._jobs)
+            data["pending"] = sum(1 for _created, job in self._jobs.values() if job["result"] is None)
+        return data
+
+
+class SqliteResolveJobs(SqliteStore):
+    """Resolve jobs shared by every worker on the host, so any worker can
+    answer a poll. SQLite errors read as a missing job, which sends the
+    page back to a synchronous resolve."""
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS resolve_jobs ("
+        "id TEXT PRIMARY KEY, created REAL NOT NULL, media_url TEXT NOT NULL, "
+        "media_type TEXT NOT NULL, result TEXT)"
+    )
+
+    def __init__(self, path: str, ttl: float, max_entries: int) -> None:
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._next_sweep = 0.0
+        self.stats: Dict[str, int] = {"created": 0, "finished": 0, "missing": 0, "errors": 0}
+
+    def create(self, media_url: str, media_type: str) -> str:
+        job_id = secrets.token_urlsafe(12)
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT INTO resolve_jobs (id, created, media_url, media_type) VALUES (?, ?, ?, ?)",
+                (job_id, now, media_url, media_type),
+            )
+            if now >= self._next_sweep:
+                self._next_sweep = now + min(60.0, self.ttl)
+                conn.execute("DELETE FROM resolve_jobs WHERE created < ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM resolve_jobs WHERE id IN ("
+                    "SELECT id FROM resolve_jobs ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self.stats["created"] += 1
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+        return job_id
+
+    def finish(self, job_id: str, result: Dict[str, object]) -> None:
+        try:
+            self._conn().execute(
+                "UPDATE resolve_jobs SET result = ? WHERE id = ?",
+                (json.dumps(result, separators=(",", ":")), job_id),
+            )
+            self.stats["finished"] += 1
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, object]]:
+        try:
+            row = self._conn().execute(
+                "SELECT media_url, media_type, result FROM resolve_jobs WHERE id = ? AND created >= ?",
+                (job_id, time.time() - self.ttl),
+            ).fetchone()
+        except sqlite3.Error:
+            self.stats["errors"] += 1
+            return None
+        if row is None:
+            self.stats["missing"] += 1
+            return None
+        result = load_items(json.loads(row[2])) if row[2] is not None else None
+        return {"media_url": row[0], "media_type": row[1], "result": result}
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+
+def make_resolve_jobs():
+    if JOB_BACKEND == "sqlite":
+        return SqliteResolveJobs(JOB_SQLITE_PATH, JOB_TTL_SECONDS, JOB_MAX_ENTRIES)
+    return ResolveJobs(JOB_TTL_SECONDS, JOB_MAX_ENTRIES)
+
+
+RESOLVE_JOBS = make_resolve_jobs()
+
+
+def resolver_pool() -> ThreadPoolExecutor:
+    global RESOLVER_POOL, RESOLVER_POOL_PID
+    with RESOLVER_POOL_LOCK:
+        if RESOLVER_POOL is None or RESOLVER_POOL_PID != os.getpid():
+            RESOLVER_POOL = ThreadPoolExecutor(
+                max_workers=max(1, RESOLVER_WORKERS), thread_name_prefix="resolver"
+            )
+            RESOLVER_POOL_PID = os.getpid()
+        return RESOLVER_POOL
+
+
+def run_resolve_job(job_id: str, media_url: str, media_type: str, client_ip: str) -> None:
+    try:
+        result = resolve_media(media_url, media_type, client_ip=client_ip)
+    except Exception as exc:  # pragma: no cover
+        result = {"status": "error", "detail": str(exc)}
+    RESOLVE_JOBS.finish(job_id, result)
+
+
+def submit_resolve_job(media_url: str, media_type: str, client_ip: str) -> str:
+    """Queue a resolve on the resolver pool and return its job id.
+
+    Links that are invalid or already cached are resolved inline, so their
+    job is finished before the id is returned.
+    """
+    job_id = RESOLVE_JOBS.create(media_url, media_type)
+    parsed = parse_media_url(media_url)
+    entry = get_cached_post(parsed[1]) if parsed else None
+    if parsed is None or entry is not None:
+        RESOLVE_JOBS.finish(job_id, resolve_media(media_url, media_type, client_ip=client_ip, entry=entry))
+    else:
+        resolver_pool().submit(run_resolve_job, job_id, media_url, media_type, client_ip)
+    return job_id
+
+
+def api_payload(result: Dict[str, object]) -> Dict[str, object]:
+    if result["status"] == "ok":
+        items = [item._asdict() for item in result["items"]]
+        return {"ok": True, "items": items, "is_reel": result["is_reel"]}
+    payload: Dict[str, object] = {"ok": False, "error": result["status"]}
+    for key in ("mismatch", "is_reel", "detail"):
+        if key in result:
+            payload[key] = result[key]
+    return payload
+
+
+def batch_pool() -> ThreadPoolExecutor:
+    global BATCH_POOL, BATCH_POOL_PID
+    with BATCH_POOL_LOCK:
+        if BATCH_POOL is None or BATCH_POOL_PID != os.getpid():
+            BATCH_POOL = ThreadPoolExecutor(max_workers=max(1, BATCH_WORKERS), thread_name_prefix="resolve")
+            BATCH_POOL_PID = os.getpid()
+        return BATCH_POOL
+
+
+def api_params() -> Tuple[str, str]:
+    params = request.values
+    if request.is_json:
+        params = request.get_json(silent=True) or {}
+    media_url = str(params.get("url") or params.get("media_url") or "").strip()
+    media_type = normalize_media_type(str(params.get("type") or params.get("media_type") or "video"))
+    return media_url, media_type
+
+
+@app.route("/api/resolve", methods=["GET", "POST"])
+def api_resolve():
+    media_url, media_type = api_params()
+    result = resolve_media(media_url, media_type)
+    status = result["status"]
+    payload = api_payload(result)
+    response = app.json.response(payload)
+    response.status_code = API_ERROR_STATUS.get(status, 200)
+    if status in {"ok", "private", "mismatch", "invalid_link"}:
+        response.headers["Cache-Control"] = f"public, max-age={API_CACHE_MAX_AGE}"
+        if request.method == "GET":
+            response.add_etag()
+            response = response.make_conditional(request)
+    else:
+        response.headers["Cache-Control"] = "no-store"
+        if status in {"rate_limited", "blocked", "timeout"}:
+            response.headers["Retry-After"] = str(RATE_LIMIT_WINDOW_SECONDS)
+    return response
+
+
+@app.route("/api/resolve-batch", methods=["POST"])
+def api_resolve_batch():
+    """Resolve up to BATCH_MAX_URLS links, streaming one NDJSON line each.
+
+    Cached links are answered first; misses run concurrently on the shared
+    batch pool and are written out as they finish. Every miss spends the
+    caller's rate-limit budget exactly like a single resolve.
+    """
+    if request.is_json:
+        body = request.get_json(silent=True) or {}
+        urls = body.get("urls") or []
+        media_type = body.get("type") or body.get("media_type") or "video"
+    else:
+        urls = request.form.getlist("urls") or (request.form.get("text") or "").splitlines()
+        media_type = request.form.get("type") or request.form.get("media_type") or "video"
+    if not isinstance(urls, list):
+        abort(400)
+    urls = [str(url).strip() for url in urls if str(url).strip()]
+    if not urls:
+        abort(400)
+    if len(urls) > BATCH_MAX_URLS:
+        return app.json.response({"ok": False, "error": "too_many_urls", "max": BATCH_MAX_URLS}), 413
+    media_type = normalize_media_type(str(media_type))
+    client_ip = get_client_ip()
+
+    def line(index: int, result: Dict[str, object]) -> str:
+        payload = {"index": index, "url": urls[index]}
+        payload.update(api_payload(result))
+        return json.dumps(payload, separators=(",", ":")) + "\n"
+
+    def generate():
+        pending = {}
+        for index, url in enumerate(urls):
+            parsed = parse_media_url(url)
+            entry = get_cached_post(parsed[1]) if parsed else None
+            if parsed is None or entry is not None:
+                yield line(index, resolve_media(url, media_type, client_ip=client_ip, entry=entry))
+                continue
+            future = batch_pool().submit(resolve_media, url, media_type, client_ip=client_ip)
+            pending[future] = index
+        try:
+            for future in as_completed(pending, timeout=BATCH_TIMEOUT_SECONDS):
+                index = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:  # pragma: no cover
+                    result = {"status": "error", "detail": str(exc)}
+                yield line(index, result)
+        except FutureTimeout:
+            for future, index in pending.items():
+                future.cancel()
+                yield line(index, {"status": "timeout"})
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def job_response(job_id: str, job: Dict[str, object]) -> Response:
+    result = job["result"]
+    payload: Dict[str, object] = {"job": job_id, "done": result is not None}
+    if result is None:
+        response = app.json.response(payload)
+        response.status_code = 202
+        response.headers["Retry-After"] = str(max(1, round(JOB_POLL_MS / 1000)))
+    else:
+        payload.update(api_payload(result))
+        response = app.json.response(payload)
+        response.status_code = API_ERROR_STATUS.get(str(result["status"]), 200)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@app.route("/api/jobs", methods=["POST"])
+def api_job_create():
+    """Queue a resolve and answer at once with a job id to poll."""
+    media_url, media_type = api_params()
+    job_id = submit_resolve_job(media_url, media_type, get_client_ip())
+    job = RESOLVE_JOBS.get(job_id) or {"result": {"status": "error", "detail": "job store unavailable"}}
+    response = job_response(job_id, job)
+    response.headers["Location"] = url_for("api_job", job_id=job_id)
+    return response
+
+
+@app.route("/api/jobs/<job_id>")
+def api_job(job_id: str):
+    job = RESOLVE_JOBS.get(job_id)
+    if job is None:
+        abort(404)
+    return job_response(job_id, job)
+
+
+def serve_cached_media(key: str) -> Optional[Response]:
+    """Answer the current request from the disk media cache if it covers it.
+
+    ``send_file`` lets the server hand the file over with sendfile.
+    """
+    located = MEDIA_CACHE.locate(key, request.range)
+    if located is None:
+        return None
+    path, content_type = located
+    return send_file(path, mimetype=content_type, conditional=True, etag=False)
+
+
 @app.route("/media-proxy")
 def media_proxy():
     url = request.args.get("url", "")
     if not is_allowed_media_url(url):
         abort(400)
 
-    headers = {}
+    cache_key = MEDIA_CACHE.key_for(url) if MEDIA_CACHE.enabled else None
+    if cache_key:
+        cached = serve_cached_media(cache_key)
+        if cached is not None:
+            return cached
+
+    headers = {"Accept-Encoding": "identity"}
     range_header = request.headers.get("Range")
     if range_header:
         headers["Range"] = range_header
 
-    resp = requests.get(url, stream=True, timeout=20, headers=headers)
+    resp = MEDIA_HTTP.get(url, stream=True, headers=headers)
     if resp.status_code not in (200, 206):
+        resp.close()
         abort(404)
 
     content_type = resp.headers.get("Content-Type", "application/octet-stream")
-    forward_headers = {}
-    for key in ("Content-Range", "Accept-Ranges", "Content-Length"):
-        if key in resp.headers:
-            forward_headers[key] = resp.headers[key]
+    forward_headers = media_headers(resp, ("Content-Range", "Accept-Ranges", "Content-Length"))
+    body = iter_media(resp)
+    if cache_key:
+        body = MEDIA_CACHE.tee(cache_key, url, resp, body)
 
     return Response(
-        stream_with_context(resp.iter_content(chunk_size=8192)),
+        stream_with_context(body),
         status=resp.status_code,
         headers=forward_headers,
         content_type=content_type,
     )
 
 
+@app.route("/media-preview")
+def media_preview():
+    """Serve a downscaled WebP or JPEG preview of a photo.
+
+    Falls back to the full-size proxy when previews are disabled or the
+    source cannot be decoded.
+    """
+    url = request.args.get("url", "")
+    if not is_allowed_media_url(url):
+        abort(400)
+    if not PREVIEWS.enabled:
+        return redirect(url_for("media_proxy", url=url))
+    width = PREVIEWS.width_for(request.args.get("w", type=int) or PREVIEWS.widths[0])
+    formats = PREVIEWS.formats()
+    fmt = formats[0] if "image/webp" in request.accept_mimetypes.values() else formats[-1]
+    try:
+        path = PREVIEWS.get(url, width, fmt)
+    except (PreviewUnavailable, ResolveTimeout):
+        return redirect(url_for("media_proxy", url=url))
+    response = send_file(path, mimetype=f"image/{fmt}", conditional=True, etag=True, max_age=PREVIEW_MAX_AGE)
+    response.vary.add("Accept")
+    return response
+
+
 @app.route("/download-file")
 def download_file():
     url = request.args.get("url", "")
     filename = safe_filename(request.args.get("name", "instagram_media"))
     if not is_allowed_media_url(url):
         abort(400)
-    resp = requests.get(url, stream=True, timeout=20)
+    disposition = f'attachment; filename="{filename}"'
+    cache_key = MEDIA_CACHE.key_for(url) if MEDIA_CACHE.enabled else None
+    if cache_key:
+        cached = serve_cached_media(cache_key)
+        if cached is not None:
+            cached.headers["Content-Disposition"] = disposition
+            return cached
+    resp = MEDIA_HTTP.get(url, stream=True, headers={"Accept-Encoding": "identity"})
     if resp.status_code != 200:
+        resp.close()
         abort(404)
     content_type = resp.headers.get("Content-Type", "application/octet-stream")
-    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    headers = media_headers(resp, ("Content-Length",))
+    headers["Content-Disposition"] = disposition
+    body = iter_media(resp)
+    if cache_key:
+        body = MEDIA_CACHE.tee(cache_key, url, resp, body)
     return Response(
-        stream_with_context(resp.iter_content(chunk_size=8192)),
+        stream_with_context(body),
         headers=headers,
         content_type=content_type,
     )
 
 
-@app.route("/<lang>/about")
-def about(lang: str):
-    lang = get_lang(lang)
+def render_static_page(lang: str, page: str) -> str:
     t = build_strings(lang)
-    page_body = t.get("page_about_html", t["page_about_body"]).format(brand=t["brand"])
     return render_template(
         "page.html",
         lang=lang,
@@ -1173,60 +3147,55 @@ def about(lang: str):
         t=t,
         languages=get_languages(),
         base_url=base_url(),
-        page_title=t["page_about_title"],
-        page_body=page_body,
-        page_slug="about",
+        page_title=t[f"page_{page}_title"],
+        page_body=page_body(lang, page, base_url()),
+        page_slug=page,
         default_lang=DEFAULT_LANG,
     )
 
 
+@app.route("/<lang>/about")
+def about(lang: str):
+    lang = get_lang(lang)
+    return cached_page(("page", lang, "about"), lambda: render_static_page(lang, "about"))
+
+
 @app.route("/<lang>/contact")
 def contact(lang: str):
     lang = get_lang(lang)
-    t = build_strings(lang)
-    contact_url = f"{base_url()}/{lang}/contact"
-    page_body = t.get("page_contact_html", t["page_contact_body"]).format(
-        brand=t["brand"],
-        contact_url=contact_url,
-    )
-    return render_template(
-        "page.html",
-        lang=lang,
-        lang_dir=LANGS[lang]["dir"],
-        t=t,
-        languages=get_languages(),
-        base_url=base_url(),
-        page_title=t["page_contact_title"],
-        page_body=page_body,
-        page_slug="contact",
-        default_lang=DEFAULT_LANG,
-    )
+    return cached_page(("page", lang, "contact"), lambda: render_static_page(lang, "contact"))
 
 
 @app.route("/<lang>/privacy")
 def privacy(lang: str):
     lang = get_lang(lang)
-    t = build_strings(lang)
-    contact_url = f"{base_url()}/{lang}/contact"
-    page_body = t.get("page_privacy_html", t["page_privacy_body"]).format(
-        brand=t["brand"],
-        contact_url=contact_url,
-    )
-    return render_template(
-        "page.html",
-        lang=lang,
-        lang_dir=LANGS[lang]["dir"],
-        t=t,
-        languages=get_languages(),
-        base_url=base_url(),
-        page_title=t["page_privacy_title"],
-        page_body=page_body,
-        page_slug="privacy",
-        default_lang=DEFAULT_LANG,
-    )
-@app.route("/sitemap.xml")
-def sitemap():
-    base = base_url()
+    return cached_page(("page", lang, "privacy"), lambda: render_static_page(lang, "privacy"))
+
+
+def site_lastmod() -> datetime:
+    """Deploy time, or the newest mtime of the code, templates and content."""
+    if DEPLOY_TIME:
+        try:
+            return datetime.fromtimestamp(float(DEPLOY_TIME), timezone.utc)
+        except ValueError:
+            parsed = datetime.fromisoformat(DEPLOY_TIME)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    root = Path(__file__).resolve().parent
+    paths = [root / "app.py", *sorted((root / "templates").glob("*.html")), *content_paths()]
+    mtimes = [path.stat().st_mtime for path in paths if path.is_file()]
+    stamp = max(mtimes) if mtimes else time.time()
+    return datetime.fromtimestamp(int(stamp), timezone.utc)
+
+
+SITE_LASTMOD = site_lastmod()
+
+
+def format_lastmod(value: datetime) -> str:
+    lastmod = value.strftime("%Y-%m-%dT%H:%M:%S%z")
+    return f"{lastmod[:-2]}:{lastmod[-2:]}"
+
+
+def sitemap_urls(base: str) -> List[Tuple[str, str]]:
     urls: List[Tuple[str, str]] = []
 
     for lang in LANG_ORDER:
@@ -1234,14 +3203,20 @@ def sitemap():
         urls.append((f"{base}/{lang}/{MEDIA_SLUGS['video']}", "0.8"))
         urls.append((f"{base}/{lang}/{MEDIA_SLUGS['reels']}", "0.8"))
         urls.append((f"{base}/{lang}/{MEDIA_SLUGS['photo']}", "0.8"))
-        
+
     urls.append((f"{base}/{DEFAULT_LANG}/about", "0.3"))
     urls.append((f"{base}/{DEFAULT_LANG}/contact", "0.3"))
     urls.append((f"{base}/{DEFAULT_LANG}/privacy", "0.3"))
+    return urls
+
+
+def sitemap_parts(urls: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+    size = max(1, SITEMAP_MAX_URLS)
+    return [urls[start:start + size] for start in range(0, len(urls), size)]
 
-    lastmod = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S%z")
-    lastmod = f"{lastmod[:-2]}:{lastmod[-2:]}"
 
+def render_urlset(urls: List[Tuple[str, str]]) -> str:
+    lastmod = format_lastmod(SITE_LASTMOD)
     xml_lines = [
         '<?xml version="1.0" encoding="UTF-8"?>',
         '<urlset xmlns="https://www.sitemaps.org/schemas/sitemap/0.9" '
@@ -1256,8 +3231,72 @@ def sitemap():
         xml_lines.append(f"    <priority>{priority}</priority>")
         xml_lines.append("  </url>")
     xml_lines.append("</urlset>")
+    return "\n".join(xml_lines)
+
+
+def render_sitemap_index(base: str, count: int) -> str:
+    lastmod = format_lastmod(SITE_LASTMOD)
+    xml_lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<sitemapindex xmlns="https://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for part in range(1, count + 1):
+        xml_lines.append("  <sitemap>")
+        xml_lines.append(f"    <loc>{base}/sitemap-{part}.xml</loc>")
+        xml_lines.append(f"    <lastmod>{lastmod}</lastmod>")
+        xml_lines.append("  </sitemap>")
+    xml_lines.append("</sitemapindex>")
+    return "\n".join(xml_lines)
+
+
+def render_sitemap() -> str:
+    base = base_url()
+    parts = sitemap_parts(sitemap_urls(base))
+    if len(parts) <= 1:
+        return render_urlset(parts[0] if parts else [])
+    return render_sitemap_index(base, len(parts))
+
+
+@app.route("/sitemap.xml")
+def sitemap():
+    return cached_page(
+        ("sitemap", ""),
+        render_sitemap,
+        mimetype="application/xml",
+        last_modified=SITE_LASTMOD,
+    )
+
+
+@app.route("/sitemap-<int:part>.xml")
+def sitemap_part(part: int):
+    parts = sitemap_parts(sitemap_urls(base_url()))
+    if len(parts) <= 1 or not 1 <= part <= len(parts):
+        abort(404)
+    return cached_page(
+        ("sitemap", str(part)),
+        lambda: render_urlset(parts[part - 1]),
+        mimetype="application/xml",
+        last_modified=SITE_LASTMOD,
+    )
+
+@app.route("/assets/<path:filename>")
+def asset(filename: str):
+    found = ASSETS_BY_URL.get(filename)
+    if found is None:
+        abort(404)
+    if not found.variants:
+        response = send_file(found.path, mimetype=found.mimetype, etag=found.digest, conditional=True)
+    else:
+        encoding = preferred_encoding(found.variants)
+        response = Response(found.variants[encoding], mimetype=found.mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        response.set_etag(f"{found.digest}-{encoding}")
+        response.vary.add("Accept-Encoding")
+        response = response.make_conditional(request)
+    response.headers["Cache-Control"] = ASSET_CACHE_CONTROL
+    return response
 
-    return Response("\n".join(xml_lines), mimetype="application/xml")
 
 @app.route("/ads.txt")
 def ads_txt():
@@ -1279,6 +3318,7 @@ def stats():
     db_data = load_stats_db()
     if db_data:
         data.update(db_data)
+    data.update(runtime_stats())
     rows = "".join(
         f"<tr><th style='text-align:left;padding:6px 10px'>{name}</th>"
         f"<td style='padding:6px 10px'>{value}</td></tr>"
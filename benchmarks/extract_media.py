@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Cost of turning a carousel post into cached media items.
+
+Builds instaloader Post objects for 10- and 20-item sidecars from node
+dicts (no network). It compares the old two-pass ``extract_items`` that
+stored dicts with the single-pass ``extract_media`` that stores MediaItem
+tuples. For each it reports extraction time, approximate cached size, and
+a JSON round trip as done by the shared SQLite cache. Run from the
+repository root:
+
+    python benchmarks/extract_media.py [--iterations 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+CDN = "https://scontent-iad3-1.cdninstagram.com/v/t51.2885-15/{}_n.{}?stp=dst-jpg_e35&_nc_ht=scontent&oh=00_AfB{}&oe=6700F1A2"
+
+
+def legacy_extract_items(post, media_type):
+    items = []
+    if post.typename == "GraphSidecar":
+        nodes = list(post.get_sidecar_nodes())
+        for idx, node in enumerate(nodes, start=1):
+            is_video = node.is_video
+            if media_type == "photo" and is_video:
+                continue
+            if media_type in {"video", "reels"} and not is_video:
+                continue
+            url = node.video_url if is_video else node.display_url
+            if not url:
+                continue
+            ext = ".mp4" if is_video else ".jpg"
+            filename = app.safe_filename(f"{post.shortcode}_{idx}{ext}")
+            items.append({"type": "video" if is_video else "photo", "url": url, "name": filename})
+    return items
+
+
+def make_post(count: int):
+    edges = []
+    for idx in range(count):
+        is_video = idx % 3 == 0
+        node = {"is_video": is_video, "display_url": CDN.format(idx, "jpg", idx)}
+        if is_video:
+            node["video_url"] = CDN.format(idx, "mp4", idx)
+        edges.append({"node": node})
+    node = {
+        "__typename": "GraphSidecar",
+        "shortcode": "Cx1AbCdEfGh",
+        "edge_sidecar_to_children": {"edges": edges},
+    }
+    return app.instaloader.Post(app.instaloader.InstaloaderContext(), node)
+
+
+def legacy(post):
+    return {
+        "video_items": legacy_extract_items(post, "video"),
+        "photo_items": legacy_extract_items(post, "photo"),
+        "is_reel": False,
+    }
+
+
+def single_pass(post):
+    return {"items": app.extract_media(post), "is_reel": False}
+
+
+def report(label: str, build, post, iterations: int, load) -> None:
+    extract = timeit.timeit(lambda: build(post), number=iterations) / iterations
+    entry = build(post)
+    encoded = json.dumps(entry, separators=(",", ":"))
+    round_trip = timeit.timeit(lambda: load(json.loads(json.dumps(entry, separators=(",", ":")))), number=iterations)
+    print(
+        f"  {label:<12} extract={extract * 1e6:6.1f}us  cached~{app.approx_size(entry):6d}B  "
+        f"json={len(encoded):5d}B  json round trip={round_trip / iterations * 1e6:6.1f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    for count in (10, 20):
+        post = make_post(count)
+        print(f"{count}-item carousel")
+        report("two-pass", legacy, post, args.iterations, lambda entry: entry)
+        report("single-pass", single_pass, post, args.iterations, app.load_items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Load test for the asyncio media proxy in media_async.py.
+
+Starts a local fake CDN and one media_async.py process in subprocesses,
+then opens ``--streams`` concurrent /media-proxy streams from this process.
+Each client reads its body at a throttled, viewer-like rate for about
+``--seconds``. The test reports how many streams were open at once, the
+time to first byte, and the proxy's peak RSS. Needs aiohttp. Run from the
+repository root:
+
+    python benchmarks/media_proxy_async.py [--streams 2000] [--size-kb 512] [--seconds 5]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, web  # noqa: E402
+
+HOST = "127.0.0.1"
+READ_SIZE = 16 * 1024
+
+
+def raise_fd_limit() -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve_cdn(port: int, size: int) -> None:
+    body = os.urandom(size)
+
+    async def media(request: web.Request) -> web.StreamResponse:
+        start, stop = 0, size
+        status = 200
+        http_range = request.http_range
+        if http_range.start is not None or http_range.stop is not None:
+            start, stop, _step = http_range.indices(size)
+            status = 206
+        response = web.StreamResponse(status=status)
+        response.content_type = "video/mp4"
+        response.content_length = stop - start
+        response.headers["Accept-Ranges"] = "bytes"
+        if status == 206:
+            response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+        await response.prepare(request)
+        for offset in range(start, stop, 256 * 1024):
+            await response.write(body[offset:min(stop, offset + 256 * 1024)])
+        await response.write_eof()
+        return response
+
+    application = web.Application()
+    application.router.add_get("/media.mp4", media)
+    web.run_app(application, host=HOST, port=port, access_log=None, print=None, backlog=4096)
+
+
+def serve_proxy(port: int) -> None:
+    import media_async
+    import media_cache
+
+    media_cache.ALLOWED_HOST_SUFFIXES = media_cache.ALLOWED_HOST_SUFFIXES + (HOST,)
+    web.run_app(media_async.create_app(), host=HOST, port=port, access_log=None, print=None, backlog=4096)
+
+
+def spawn(*args: str) -> subprocess.Popen:
+    env = dict(os.environ, MEDIA_CACHE_MAX_BYTES="0")
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), *args], env=env, cwd=ROOT)
+
+
+async def wait_ready(url: str) -> None:
+    deadline = time.time() + 15
+    async with ClientSession() as session:
+        while time.time() < deadline:
+            try:
+                async with session.get(url) as resp:
+                    await resp.read()
+                    return
+            except Exception:
+                await asyncio.sleep(0.1)
+    raise SystemExit(f"{url} did not start")
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def load(url: str, streams: int, size: int, seconds: float) -> None:
+    state = {"open": 0, "peak": 0, "errors": 0, "bytes": 0}
+    ttfb = []
+    delay = seconds / max(1, size // READ_SIZE)
+
+    async def one(session: ClientSession) -> None:
+        started = time.perf_counter()
+        try:
+            async with session.get(url, headers={"Range": "bytes=0-"}) as resp:
+                if resp.status not in (200, 206):
+                    state["errors"] += 1
+                    return
+                state["open"] += 1
+                state["peak"] = max(state["peak"], state["open"])
+                first = True
+                try:
+                    while True:
+                        chunk = await resp.content.read(READ_SIZE)
+                        if not chunk:
+                            break
+                        if first:
+                            ttfb.append(time.perf_counter() - started)
+                            first = False
+                        state["bytes"] += len(chunk)
+                        await asyncio.sleep(delay)
+                finally:
+                    state["open"] -= 1
+        except Exception:
+            state["errors"] += 1
+
+    connector = TCPConnector(limit=0, force_close=True)
+    async with ClientSession(connector=connector, timeout=ClientTimeout(total=None, sock_read=60)) as session:
+        wall = time.perf_counter()
+        await asyncio.gather(*(one(session) for _ in range(streams)))
+        wall = time.perf_counter() - wall
+    ttfb.sort()
+    mb = state["bytes"] / (1024 * 1024)
+    print(f"streams={streams} concurrent_peak={state['peak']} errors={state['errors']}")
+    print(f"wall={wall:.1f}s  {mb:.0f}MB  {mb / wall:.1f}MB/s")
+    if ttfb:
+        print(
+            f"ttfb p50={ttfb[len(ttfb) // 2] * 1000:.0f}ms "
+            f"p99={ttfb[min(len(ttfb) - 1, int(len(ttfb) * 0.99))] * 1000:.0f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=2000)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--cdn-port", type=int, default=8766)
+    parser.add_argument("--proxy-port", type=int, default=8767)
+    parser.add_argument("--serve", choices=("cdn", "proxy"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    if args.serve == "cdn":
+        return serve_cdn(args.cdn_port, args.size_kb * 1024)
+    if args.serve == "proxy":
+        return serve_proxy(args.proxy_port)
+
+    common = ("--cdn-port", str(args.cdn_port), "--proxy-port", str(args.proxy_port), "--size-kb", str(args.size_kb))
+    cdn = spawn("--serve", "cdn", *common)
+    proxy = spawn("--serve", "proxy", *common)
+    try:
+        media = f"http://{HOST}:{args.cdn_port}/media.mp4"
+        url = f"http://{HOST}:{args.proxy_port}/media-proxy?url={quote(media, safe='')}"
+        asyncio.run(wait_ready(media))
+        asyncio.run(wait_ready(url))
+        asyncio.run(load(url, args.streams, args.size_kb * 1024, args.seconds))
+        print(f"proxy peak rss={peak_rss_mb(proxy.pid):.0f}MB")
+    finally:
+        for proc in (proxy, cdn):
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
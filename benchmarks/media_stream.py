@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Throughput and CPU cost of streaming proxied media through the app.
+
+Serves a large file from a local fake CDN in a separate process and pulls
+it through /download-file, once with the legacy 8 KiB ``iter_content``
+loop and once with ``iter_media``. Run from the repository root:
+
+    python benchmarks/media_stream.py [--size-mb 64] [--rounds 3]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+import media_cache  # noqa: E402
+
+CDN_HOST = "127.0.0.1"
+
+
+def legacy_iter_media(resp):
+    try:
+        yield from resp.iter_content(chunk_size=8192)
+    finally:
+        resp.close()
+
+
+def start_fake_cdn(root: str, port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "http.server", str(port), "--bind", CDN_HOST, "--directory", root],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            app.MEDIA_HTTP.get(f"http://{CDN_HOST}:{port}/", timeout=1).close()
+            return proc
+        except Exception:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("fake CDN did not start")
+
+
+def stream_once(client, url: str) -> int:
+    resp = client.get("/download-file", query_string={"url": url, "name": "bench.mp4"}, buffered=False)
+    total = 0
+    try:
+        for chunk in resp.response:
+            total += len(chunk)
+    finally:
+        resp.close()
+    return total
+
+
+def run(label: str, client, url: str, rounds: int) -> None:
+    total = 0
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(rounds):
+        total += stream_once(client, url)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    mb = total / (1024 * 1024)
+    print(
+        f"{label:<8} {mb:8.1f}MB  {mb / wall:8.1f}MB/s  "
+        f"cpu/stream={cpu / rounds * 1000:7.1f}ms  cpu/MB={cpu / mb * 1000:6.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    media_cache.ALLOWED_HOST_SUFFIXES = media_cache.ALLOWED_HOST_SUFFIXES + (CDN_HOST,)
+    client = app.app.test_client()
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "reel.mp4"), "wb") as fh:
+            fh.write(os.urandom(args.size_mb * 1024 * 1024))
+        proc = start_fake_cdn(root, args.port)
+        try:
+            url = f"http://{CDN_HOST}:{args.port}/reel.mp4"
+            stream_once(client, url)
+            current = app.iter_media
+            app.iter_media = legacy_iter_media
+            run("legacy", client, url, args.rounds)
+            app.iter_media = current
+            run("adaptive", client, url, args.rounds)
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
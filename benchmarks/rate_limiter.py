@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Memory and check latency of the rate limiter at 1M distinct client IPs.
+
+Run from the repository root:
+
+    python benchmarks/rate_limiter.py [--keys 1000000] [--max-keys 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def fake_ip(n: int) -> str:
+    return f"{10 + (n >> 24) % 200}.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+def bench_memory(keys: int, max_keys: int) -> None:
+    limiter = app.TokenBucketLimiter(
+        app.RATE_LIMIT_MAX_REQUESTS, app.RATE_LIMIT_WINDOW_SECONDS, max_keys
+    )
+    ips = [fake_ip(n) for n in range(keys)]
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for ip in ips:
+        limiter.hit(ip)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracked = limiter.snapshot()["keys"]
+    print(
+        f"memory  keys={keys:,} max_keys={max_keys:,} tracked={tracked:,} "
+        f"mem={(current - base) / 1e6:.1f}MB peak={(peak - base) / 1e6:.1f}MB "
+        f"check={elapsed / keys * 1e6:.2f}us"
+    )
+
+
+def bench_hot(keys: int, max_keys: int, checks: int) -> None:
+    limiter = app.TokenBucketLimiter(
+        app.RATE_LIMIT_MAX_REQUESTS, app.RATE_LIMIT_WINDOW_SECONDS, max_keys
+    )
+    ips = [fake_ip(n) for n in range(min(keys, max_keys))]
+    for ip in ips:
+        limiter.hit(ip)
+    start = time.perf_counter()
+    for n in range(checks):
+        limiter.hit(ips[(n * 7919) % len(ips)])
+    elapsed = time.perf_counter() - start
+    print(f"latency tracked={len(ips):,} checks={checks:,} check={elapsed / checks * 1e6:.2f}us")
+
+
+def bench_sqlite(checks: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        limiter = app.SqliteTokenBucketLimiter(
+            os.path.join(tmp, "limits.sqlite3"),
+            app.RATE_LIMIT_MAX_REQUESTS,
+            app.RATE_LIMIT_WINDOW_SECONDS,
+            app.RATE_LIMIT_MAX_KEYS,
+        )
+        start = time.perf_counter()
+        for n in range(checks):
+            limiter.hit(fake_ip(n))
+        elapsed = time.perf_counter() - start
+        print(f"sqlite  checks={checks:,} check={elapsed / checks * 1e6:.2f}us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--max-keys", type=int, default=app.RATE_LIMIT_MAX_KEYS)
+    parser.add_argument("--checks", type=int, default=200_000)
+    parser.add_argument("--sqlite-checks", type=int, default=20_000)
+    args = parser.parse_args()
+
+    bench_memory(args.keys, args.max_keys)
+    bench_memory(args.keys, args.keys)
+    bench_hot(args.keys, args.max_keys, args.checks)
+    bench_sqlite(args.sqlite_checks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Per-request cost of looking up translated strings for every language.
+
+Compares merging the English table with the target language on each call
+(the old ``build_strings``) against the precomputed read-only tables, and
+formatting the static page bodies against the memoized ``page_body``.
+Run from the repository root:
+
+    python benchmarks/strings.py [--iterations 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+BASE = "https://fastdlapp.cc"
+
+
+def merge_per_request(lang: str):
+    base = app.STRINGS[app.DEFAULT_LANG].copy()
+    base.update(app.STRINGS.get(lang, {}))
+    return base
+
+
+def format_per_request(lang: str) -> str:
+    t = merge_per_request(lang)
+    return t.get("page_privacy_html", t["page_privacy_body"]).format(
+        brand=t["brand"], contact_url=f"{BASE}/{lang}/contact"
+    )
+
+
+def timed(fn, lang: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(lang)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'lang':<5} {'merge':>9} {'table':>9} {'privacy':>10} {'memoized':>10}  (us/call)")
+    for lang in app.LANG_ORDER:
+        merge = timed(merge_per_request, lang, args.iterations)
+        table = timed(app.build_strings, lang, args.iterations)
+        fmt = timed(format_per_request, lang, args.iterations)
+        memo = timed(lambda code: app.page_body(code, "privacy", BASE), lang, args.iterations)
+        print(f"{lang:<5} {merge:9.2f} {table:9.2f} {fmt:10.2f} {memo:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
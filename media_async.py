@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Asyncio companion server for ``/media-proxy`` and ``/download-file``.
+
+The Flask routes hold a sync worker for as long as a viewer keeps a video
+open. This server answers the same two paths on one event loop, so a
+process can keep thousands of streams open. Point those two paths at it
+from the front proxy and leave everything else on the Flask app.
+
+It applies the same host allowlist, Range forwarding and disk media cache
+as app.py, through media_cache.py, so it never loads the Flask app.
+Upstream requests share a keep-alive aiohttp connection pool. Bytes bound
+for the cache are gathered into ``ASYNC_MEDIA_WRITE_BYTES`` batches and
+written on the default executor, keeping disk I/O off the event loop.
+``StreamResponse.write`` waits for the client socket to drain, so a slow
+viewer pauses the upstream read and the process buffers only a bounded
+amount per stream.
+
+    python media_async.py --port 8001
+    gunicorn media_async:create_app --worker-class aiohttp.GunicornWebWorker
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+from typing import Dict, Optional
+
+try:
+    from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector, web
+except ModuleNotFoundError as exc:  # pragma: no cover
+    raise SystemExit("media_async.py needs aiohttp: pip install aiohttp") from exc
+from werkzeug.http import parse_range_header
+
+import media_cache
+from media_cache import MEDIA_CACHE
+
+STATS_KEY = os.environ.get("STATS_KEY", "5988")
+ASYNC_MEDIA_LIMIT = int(os.environ.get("ASYNC_MEDIA_LIMIT", "0") or 0)
+ASYNC_MEDIA_LIMIT_PER_HOST = int(os.environ.get("ASYNC_MEDIA_LIMIT_PER_HOST", "0") or 0)
+ASYNC_MEDIA_WRITE_BYTES = int(os.environ.get("ASYNC_MEDIA_WRITE_BYTES", str(1024 * 1024)) or 1024 * 1024)
+
+CLIENT = web.AppKey("client", ClientSession)
+STATS: Dict[str, int] = {"streams": 0, "active": 0, "peak": 0, "cache_hits": 0, "upstream_errors": 0}
+
+
+async def open_client(application: web.Application):
+    connector = TCPConnector(
+        limit=ASYNC_MEDIA_LIMIT,
+        limit_per_host=ASYNC_MEDIA_LIMIT_PER_HOST,
+        ttl_dns_cache=300,
+    )
+    timeout = ClientTimeout(
+        total=None,
+        sock_connect=media_cache.MEDIA_TIMEOUT_SECONDS,
+        sock_read=media_cache.MEDIA_TIMEOUT_SECONDS,
+    )
+    application[CLIENT] = ClientSession(connector=connector, timeout=timeout, auto_decompress=False)
+    yield
+    await application[CLIENT].close()
+
+
+async def serve_cached(request: web.Request, key: str, disposition: Optional[str]) -> Optional[web.StreamResponse]:
+    byte_range = parse_range_header(request.headers.get("Range"))
+    loop = asyncio.get_running_loop()
+    located = await loop.run_in_executor(None, MEDIA_CACHE.locate, key, byte_range)
+    if located is None:
+        return None
+    path, content_type = located
+    headers = {"Content-Type": content_type}
+    if disposition:
+        headers["Content-Disposition"] = disposition
+    STATS["cache_hits"] += 1
+    return web.FileResponse(path, headers=headers)
+
+
+async def relay(
+    request: web.Request, url: str, *, forward_range: bool, disposition: Optional[str] = None
+) -> web.StreamResponse:
+    """Stream ``url`` to the client, writing the bytes through to the cache."""
+    key = MEDIA_CACHE.key_for(url) if MEDIA_CACHE.enabled else None
+    if key:
+        cached = await serve_cached(request, key, disposition)
+        if cached is not None:
+            return cached
+
+    headers = {"Accept-Encoding": "identity"}
+    if forward_range and request.headers.get("Range"):
+        headers["Range"] = request.headers["Range"]
+    try:
+        upstream = await request.app[CLIENT].get(url, headers=headers)
+    except (ClientError, asyncio.TimeoutError):
+        STATS["upstream_errors"] += 1
+        raise web.HTTPBadGateway()
+
+    loop = asyncio.get_running_loop()
+    async with upstream:
+        if upstream.status not in ((200, 206) if forward_range else (200,)):
+            raise web.HTTPNotFound()
+        keys = ("Content-Range", "Accept-Ranges", "Content-Length") if forward_range else ("Content-Length",)
+        response = web.StreamResponse(status=upstream.status)
+        for name in keys:
+            if name in upstream.headers:
+                response.headers[name] = upstream.headers[name]
+        response.headers["Content-Type"] = upstream.headers.get("Content-Type", "application/octet-stream")
+        if disposition:
+            response.headers["Content-Disposition"] = disposition
+
+        opened = None
+        if key:
+            opened = await loop.run_in_executor(
+                None, MEDIA_CACHE.begin, key, url, upstream.status, upstream.headers
+            )
+        offset = written = opened[1] if opened else 0
+        pending = bytearray()
+        caching = opened is not None
+        STATS["streams"] += 1
+        STATS["active"] += 1
+        STATS["peak"] = max(STATS["peak"], STATS["active"])
+        try:
+            await response.prepare(request)
+            async for chunk in upstream.content.iter_chunked(media_cache.MEDIA_CHUNK_MIN):
+                if caching:
+                    pending += chunk
+                    if len(pending) >= ASYNC_MEDIA_WRITE_BYTES:
+                        batch = bytes(pending)
+                        pending.clear()
+                        try:
+                            written += await loop.run_in_executor(None, os.pwrite, opened[0], batch, written)
+                        except OSError:
+                            MEDIA_CACHE.stats["errors"] += 1
+                            caching = False
+                await response.write(chunk)
+            await response.write_eof()
+        except (ConnectionResetError, ClientError, asyncio.TimeoutError):
+            pass
+        finally:
+            STATS["active"] -= 1
+            if opened:
+                await loop.run_in_executor(None, flush_cache, key, opened[0], offset, written, bytes(pending))
+    return response
+
+
+def flush_cache(key: str, fd: int, offset: int, written: int, tail: bytes) -> None:
+    """Write the last partial batch and record what reached the file."""
+    try:
+        if tail:
+            written += os.pwrite(fd, tail, written)
+    except OSError:
+        MEDIA_CACHE.stats["errors"] += 1
+    MEDIA_CACHE.finish(key, fd, offset, written)
+
+
+async def media_proxy(request: web.Request) -> web.StreamResponse:
+    url = request.query.get("url", "")
+    if not media_cache.is_allowed_media_url(url):
+        raise web.HTTPBadRequest()
+    return await relay(request, url, forward_range=True)
+
+
+async def download_file(request: web.Request) -> web.StreamResponse:
+    url = request.query.get("url", "")
+    filename = media_cache.safe_filename(request.query.get("name", "instagram_media"))
+    if not media_cache.is_allowed_media_url(url):
+        raise web.HTTPBadRequest()
+    return await relay(request, url, forward_range=False, disposition=f'attachment; filename="{filename}"')
+
+
+async def stats(request: web.Request) -> web.Response:
+    if request.query.get("key", "") != STATS_KEY:
+        raise web.HTTPNotFound()
+    return web.json_response(STATS)
+
+
+def create_app() -> web.Application:
+    application = web.Application()
+    application.cleanup_ctx.append(open_client)
+    application.router.add_get("/media-proxy", media_proxy)
+    application.router.add_get("/download-file", download_file)
+    application.router.add_get("/media-stats", stats)
+    return application
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
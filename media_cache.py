@@ -0,0 +1,338 @@
+"""Disk media cache and CDN URL helpers shared by app.py and media_async.py.
+
+Kept free of Flask and instaloader so the asyncio media server can import
+it without loading the whole web app.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from werkzeug.datastructures import Range
+
+MEDIA_TIMEOUT_SECONDS = 20
+MEDIA_CHUNK_MIN = int(os.environ.get("MEDIA_CHUNK_MIN", str(64 * 1024)) or 64 * 1024)
+MEDIA_CHUNK_MAX = int(os.environ.get("MEDIA_CHUNK_MAX", str(1024 * 1024)) or 1024 * 1024)
+MEDIA_CACHE_DIR = os.environ.get(
+    "MEDIA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fastdl-media-cache")
+)
+# The disk media cache is opt-in: set MEDIA_CACHE_MAX_BYTES (and usually
+# MEDIA_CACHE_DIR) to enable it.
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get("MEDIA_CACHE_MAX_BYTES", "0") or 0)
+MEDIA_CACHE_TTL_SECONDS = int(os.environ.get("MEDIA_CACHE_TTL_SECONDS", "86400") or 86400)
+MEDIA_CACHE_SWEEP_SECONDS = int(os.environ.get("MEDIA_CACHE_SWEEP_SECONDS", "60") or 60)
+
+ALLOWED_HOST_SUFFIXES = ("cdninstagram.com", "fbcdn.net", "instagram.com")
+
+
+def safe_filename(name: str) -> str:
+    cleaned = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_")
+    return cleaned or "instagram_media"
+
+
+def is_allowed_media_url(url: str) -> bool:
+    parsed = urlparse(url)
+    if parsed.scheme not in {"http", "https"}:
+        return False
+    host = parsed.hostname or ""
+    return any(host == suffix or host.endswith(f".{suffix}") for suffix in ALLOWED_HOST_SUFFIXES)
+
+
+class SqliteStore:
+    """Base for host-wide state kept in a SQLite file in WAL mode.
+
+    Connections are opened per thread, and again in a forked child, so no
+    handle is ever shared across processes.
+    """
+
+    schema = ""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(self.schema)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+
+CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+)")
+EXPIRY_CDN_PARAMS = {"oe"}
+
+
+def cdn_url_expiry(url: str) -> Optional[float]:
+    # Instagram CDN links carry their expiry as a hex unix timestamp in ``oe``.
+    for key, value in parse_qsl(urlparse(url).query):
+        if key == "oe":
+            try:
+                return float(int(value, 16))
+            except ValueError:
+                return None
+    return None
+
+
+def normalize_cdn_url(url: str) -> str:
+    """Return ``url`` with its query sorted and the expiry parameter dropped.
+
+    The host and every signed parameter stay in, so two differently signed
+    links never share a cache entry; only ``oe`` is left out.
+    """
+    parsed = urlparse(url)
+    params = sorted((key, value) for key, value in parse_qsl(parsed.query) if key not in EXPIRY_CDN_PARAMS)
+    return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}{parsed.path}?{urlencode(params)}"
+
+
+def merge_ranges(ranges: List[List[int]], start: int, stop: int) -> List[List[int]]:
+    merged: List[List[int]] = []
+    for lo, hi in sorted(ranges + [[start, stop]]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+class MediaCache(SqliteStore):
+    """Host-wide disk cache for CDN media that understands byte ranges.
+
+    Each object is a sparse file sized to the full upstream length. The
+    SQLite index records which byte ranges of it have been filled, so a
+    request is answered from disk only when every byte it asks for is
+    present.
+    Otherwise the request goes upstream and the streamed bytes are written
+    into the file at their offset. Entries expire with the signed URL and
+    the least recently used ones are evicted once the cache exceeds
+    ``max_bytes``.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS media_cache ("
+        "key TEXT PRIMARY KEY, size INTEGER NOT NULL, content_type TEXT NOT NULL, "
+        "expires REAL NOT NULL, ranges TEXT NOT NULL, cached INTEGER NOT NULL, "
+        "accessed REAL NOT NULL)"
+    )
+
+    def __init__(self, root: str, max_bytes: int, ttl: float, sweep_interval: float) -> None:
+        super().__init__(os.path.join(root, "index.sqlite3"))
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._ready = False
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "written": 0, "evicted": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _conn(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(self.root, exist_ok=True)
+            self._ready = True
+        return super()._conn()
+
+    def key_for(self, url: str) -> str:
+        return hashlib.sha1(normalize_cdn_url(url).encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def lookup(self, key: str) -> Optional[Dict[str, object]]:
+        row = self._conn().execute(
+            "SELECT size, content_type, ranges, accessed FROM media_cache "
+            "WHERE key = ? AND expires >= ?",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"size": row[0], "content_type": row[1], "ranges": json.loads(row[2]), "accessed": row[3]}
+
+    def locate(self, key: str, byte_range: Optional[Range]) -> Optional[Tuple[str, str]]:
+        """Return ``(path, content_type)`` if the cache covers ``byte_range``."""
+        try:
+            entry = self.lookup(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            size = entry["size"]
+            start, stop = 0, size
+            if byte_range is not None:
+                bounds = byte_range.range_for_length(size)
+                if bounds is None:
+                    self.stats["misses"] += 1
+                    return None
+                start, stop = bounds
+            covered = any(lo <= start and stop <= hi for lo, hi in entry["ranges"])
+            path = self.path_for(key)
+            if not covered or not os.path.isfile(path):
+                self.stats["misses"] += 1
+                return None
+            now = time.time()
+            if now - entry["accessed"] > 60:
+                self._conn().execute("UPDATE media_cache SET accessed = ? WHERE key = ?", (now, key))
+        except (OSError, sqlite3.Error):
+            self.stats["errors"] += 1
+            return None
+        self.stats["hits"] += 1
+        return path, entry["content_type"]
+
+    def tee(self, key: str, url: str, resp, body):
+        """Wrap ``body`` so the streamed bytes are also written to the cache."""
+        opened = self.begin(key, url, resp.status_code, resp.headers)
+        if opened is None:
+            return body
+        return self._write_through(key, opened[0], opened[1], body)
+
+    def begin(self, key: str, url: str, status: int, headers: Mapping[str, str]) -> Optional[Tuple[int, int]]:
+        """Prepare the cache file for an upstream response.
+
+        Returns ``(fd, offset)`` to write the body at, or None when the
+        response cannot be cached. Pass the result to :meth:`finish` once
+        the body has been written.
+        """
+        if headers.get("Content-Encoding", "identity").strip().lower() not in {"", "identity"}:
+            return None
+        if status == 206:
+            match = CONTENT_RANGE_RE.match(headers.get("Content-Range", ""))
+            if not match:
+                return None
+            offset, size = int(match.group(1)), int(match.group(3))
+        else:
+            length = headers.get("Content-Length", "")
+            if not length.isdigit():
+                return None
+            offset, size = 0, int(length)
+        if size <= 0 or size > self.max_bytes:
+            return None
+        expires = cdn_url_expiry(url) or time.time() + self.ttl
+        content_type = headers.get("Content-Type", "application/octet-stream")
+        try:
+            return self._open(key, size, content_type, expires), offset
+        except (OSError, sqlite3.Error):
+            self.stats["errors"] += 1
+            return None
+
+    def finish(self, key: str, fd: int, start: int, stop: int) -> None:
+        os.close(fd)
+        if stop > start:
+            self._record(key, start, stop)
+
+    def _open(self, key: str, size: int, content_type: str, expires: float) -> int:
+        conn = self._conn()
+        row = conn.execute("SELECT size FROM media_cache WHERE key = ?", (key,)).fetchone()
+        reset = row is None or row[0] != size
+        if reset:
+            conn.execute(
+                "INSERT OR REPLACE INTO media_cache "
+                "(key, size, content_type, expires, ranges, cached, accessed) "
+                "VALUES (?, ?, ?, ?, '[]', 0, ?)",
+                (key, size, content_type, expires, time.time()),
+            )
+        else:
+            conn.execute(
+                "UPDATE media_cache SET expires = MAX(expires, ?) WHERE key = ?", (expires, key)
+            )
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if reset or os.fstat(fd).st_size != size:
+            os.ftruncate(fd, size)
+        return fd
+
+    def _write_through(self, key: str, fd: int, offset: int, body):
+        position = offset
+        try:
+            for chunk in body:
+                os.pwrite(fd, chunk, position)
+                position += len(chunk)
+                yield chunk
+        finally:
+            self.finish(key, fd, offset, position)
+
+    def _record(self, key: str, start: int, stop: int) -> None:
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT ranges FROM media_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    ranges = merge_ranges(json.loads(row[0]), start, stop)
+                    cached = sum(hi - lo for lo, hi in ranges)
+                    conn.execute(
+                        "UPDATE media_cache SET ranges = ?, cached = ?, accessed = ? WHERE key = ?",
+                        (json.dumps(ranges), cached, time.time(), key),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self.stats["written"] += stop - start
+            now = time.time()
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_interval
+                self.evict()
+        except (OSError, sqlite3.Error):
+            self.stats["errors"] += 1
+
+    def _delete(self, conn: sqlite3.Connection, keys: List[str]) -> None:
+        for key in keys:
+            conn.execute("DELETE FROM media_cache WHERE key = ?", (key,))
+            try:
+                os.unlink(self.path_for(key))
+            except OSError:
+                pass
+        self.stats["evicted"] += len(keys)
+
+    def evict(self) -> None:
+        conn = self._conn()
+        expired = [row[0] for row in conn.execute(
+            "SELECT key FROM media_cache WHERE expires < ?", (time.time(),)
+        )]
+        self._delete(conn, expired)
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM media_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims: List[str] = []
+        target = total - int(self.max_bytes * 0.9)
+        for key, size in conn.execute("SELECT key, size FROM media_cache ORDER BY accessed"):
+            if target <= 0:
+                break
+            victims.append(key)
+            target -= size
+        self._delete(conn, victims)
+
+    def snapshot(self) -> Dict[str, int]:
+        data = dict(self.stats)
+        if not self.enabled:
+            return data
+        try:
+            entries, cached = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(cached), 0) FROM media_cache"
+            ).fetchone()
+            data["entries"] = entries
+            data["bytes"] = cached
+        except sqlite3.Error:
+            pass
+        return data
+
+
+MEDIA_CACHE = MediaCache(
+    MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, MEDIA_CACHE_TTL_SECONDS, MEDIA_CACHE_SWEEP_SECONDS
+)